@@ -0,0 +1,81 @@
+"""
+Бенчмарк сериализации ответа /api/questions/.
+
+Сравнивает стандартный провайдер Flask с FastJSONProvider (orjson) на
+списке из N вопросов в формате Question.to_dict().
+
+    python benchmarks/bench_json.py --questions 5000 --repeat 10
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DATABASE_URI', 'sqlite:///:memory:')
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from cp_app import app  # noqa: E402
+from cp_app.json_provider import FastJSONProvider, orjson  # noqa: E402
+
+ANSWER = ('Генератор возвращает значения по одному через `yield`, '
+          'поэтому **не держит** всю последовательность в памяти. ') * 8
+TAGS = ['python', 'генераторы', 'память', 'итераторы']
+
+
+def build_payload(size):
+    return {
+        'questions': [
+            dict(id=i, title=f'Вопрос {i}: как работают генераторы?',
+                 text=f'{i}. {ANSWER}', tags=TAGS[:i % len(TAGS) + 1])
+            for i in range(1, size + 1)
+        ],
+        'next': size,
+    }
+
+
+def measure(providers, payload, repeat):
+    """Лучшее время (с) и размер тела для каждого провайдера.
+
+    Прогоны чередуются, чтобы шум машины одинаково влиял на оба пути.
+    """
+    best = [float('inf')] * len(providers)
+    sizes = [0] * len(providers)
+    for _ in range(repeat):
+        for i, provider in enumerate(providers):
+            started = time.perf_counter()
+            response = provider.response(payload)
+            best[i] = min(best[i], time.perf_counter() - started)
+            sizes[i] = response.content_length
+    return list(zip(best, sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson не установлен: FastJSONProvider совпадает со стандартным')
+    payload = build_payload(args.questions)
+    with app.app_context():
+        (default, default_size), (fast, fast_size) = measure(
+            [DefaultJSONProvider(app), FastJSONProvider(app)],
+            payload, args.repeat
+        )
+    print(f'вопросов: {args.questions}, повторов: {args.repeat}')
+    for name, elapsed, size in (
+        ('DefaultJSONProvider', default, default_size),
+        ('FastJSONProvider', fast, fast_size),
+    ):
+        print(f'{name:<20} {elapsed * 1000:8.2f} мс  '
+              f'{size / 1024 / 1024 / elapsed:8.1f} МиБ/с  '
+              f'{size / 1024:8.0f} КиБ')
+    print(f'ускорение:           {default / fast:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Микробенчмарк рендеринга Markdown.
+
+Сравнивает старый путь (новый markdown.Markdown и bleach.clean на каждый
+документ) с переиспользуемым MarkdownRenderer.
+
+    python benchmarks/bench_markdown.py --docs 500 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DATABASE_URI', 'sqlite:///:memory:')
+
+import markdown  # noqa: E402
+from bleach import clean  # noqa: E402
+
+from cp_app.rendering import (  # noqa: E402
+    ALLOWED_TAGS, MARKDOWN_EXTENSIONS, MarkdownRenderer
+)
+
+ANSWER_TEMPLATE = """\
+Вопрос №{n} касается **генераторов** и *итераторов* в Python.
+
+Генератор — это функция, которая возвращает значения по одному через
+`yield`. Ключевые моменты:
+
+- ленивое вычисление;
+- экономия памяти;
+- возможность бесконечных последовательностей.
+
+```python
+def countdown(n):
+    while n > 0:
+        yield n
+        n -= 1
+
+for value in countdown({n}):
+    print(value)
+```
+
+| Приём      | Память | Скорость |
+|------------|--------|----------|
+| список     | O(n)   | быстро   |
+| генератор  | O(1)   | быстро   |
+
+> Подробнее см. [PEP 255](https://peps.python.org/pep-0255/).
+
+```sql
+SELECT id, title FROM question WHERE id > {n} ORDER BY id LIMIT 20;
+```
+"""
+
+
+def legacy_md_to_html(text):
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return clean(md.convert(text), tags=ALLOWED_TAGS, strip=True)
+
+
+def build_corpus(size):
+    return [ANSWER_TEMPLATE.format(n=i) for i in range(size)]
+
+
+def measure(renders, corpus, repeat):
+    """Возвращает документы/с для каждого рендерера (лучший из прогонов).
+
+    Прогоны чередуются, чтобы шум машины одинаково влиял на оба пути.
+    """
+    best = [float('inf')] * len(renders)
+    for _ in range(repeat):
+        for i, render in enumerate(renders):
+            started = time.perf_counter()
+            for doc in corpus:
+                render(doc)
+            best[i] = min(best[i], time.perf_counter() - started)
+    return [len(corpus) / elapsed for elapsed in best]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.docs)
+    renderer = MarkdownRenderer()
+    assert renderer.render(corpus[0]) == legacy_md_to_html(corpus[0])
+
+    legacy, reused = measure(
+        [legacy_md_to_html, renderer.render], corpus, args.repeat
+    )
+    print(f'документов: {args.docs}, повторов: {args.repeat}')
+    print(f'старый путь (md_to_html):  {legacy:10.1f} док/с')
+    print(f'MarkdownRenderer:          {reused:10.1f} док/с')
+    print(f'ускорение:                 {reused / legacy:10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
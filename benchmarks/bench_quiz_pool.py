@@ -0,0 +1,86 @@
+"""
+Бенчмарк выбора вопросов для квиза.
+
+Сравнивает старый quiz_begin (загрузка всех Question ради их id) с пулом
+id: холодный старт (одна колоночная выборка) и тёплый (только sample).
+
+    python benchmarks/bench_quiz_pool.py --sizes 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+_db_fd, DB_PATH = tempfile.mkstemp(suffix='.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_PATH}'
+
+from cp_app import app, db  # noqa: E402
+from cp_app.models import Question  # noqa: E402
+from cp_app.question_pool import QuestionIdPool  # noqa: E402
+
+ANSWER = 'Генераторы возвращают значения лениво через `yield`. ' * 40
+
+
+def fill(size):
+    db.drop_all()
+    db.create_all()
+    rows = [
+        dict(id=i, title=f'Вопрос {i}?', text=f'{i}: {ANSWER}',
+             title_html='', text_html='')
+        for i in range(1, size + 1)
+    ]
+    # Core-вставка: без рендеринга Markdown, только объём данных
+    for start in range(0, size, 5000):
+        db.session.execute(db.insert(Question), rows[start:start + 5000])
+    db.session.commit()
+
+
+def legacy_begin():
+    all_ids = [q.id for q in Question.query.all()]
+    db.session.expunge_all()
+    return random.sample(all_ids, k=min(10, len(all_ids)))
+
+
+def measure(func, repeat):
+    best = float('inf')
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with app.app_context():
+        for size in args.sizes:
+            fill(size)
+            pool = QuestionIdPool(refresh_interval=3600, reload_interval=3600)
+            results = [
+                ('Question.query.all()', measure(legacy_begin, args.repeat)),
+                ('пул, холодный старт',
+                 measure(lambda: (pool.clear(), pool.sample(10)), args.repeat)),
+                ('пул, тёплый', measure(lambda: pool.sample(10), args.repeat)),
+            ]
+            print(f'вопросов: {size}')
+            for name, (ms, mib) in results:
+                print(f'  {name:<24} {ms:10.3f} мс  {mib:8.2f} МиБ пик')
+    os.close(_db_fd)
+    os.unlink(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
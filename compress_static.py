@@ -0,0 +1,69 @@
+"""
+compress_static.py
+Шаг сборки: пишет рядом с файлами cp_app/static сжатые копии .gz
+(и .br, если установлен brotli), которые приложение отдаёт вместо
+оригиналов без сжатия на лету.
+
+    python compress_static.py [--level 9] [--min-size 512]
+
+Файлы, у которых сжатая копия свежее оригинала, пропускаются.
+Совместимо с Python 3.9.
+"""
+import argparse
+import gzip
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent / "cp_app" / "static"
+# Уже сжатые форматы (png, woff2 и т.п.) не трогаем
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map",
+                ".ttf", ".otf", ".eot"}
+
+
+def _write_if_smaller(target: Path, data: bytes, packed: bytes):
+    if len(packed) >= len(data):
+        if target.exists():
+            target.unlink()
+        return False
+    target.write_bytes(packed)
+    return True
+
+
+def compress_file(path: Path, level: int):
+    data = path.read_bytes()
+    written = 0
+    variants = [(".gz", lambda d: gzip.compress(d, compresslevel=level, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+    for suffix, compress in variants:
+        target = path.with_name(path.name + suffix)
+        if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+            continue
+        written += _write_if_smaller(target, data, compress(data))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Предсжатие статики")
+    parser.add_argument("--level", type=int, default=9,
+                        help="уровень gzip (1-9)")
+    parser.add_argument("--min-size", type=int, default=512,
+                        help="не сжимать файлы меньше этого размера, байт")
+    args = parser.parse_args()
+
+    counter = 0
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        if path.stat().st_size < args.min_size:
+            continue
+        counter += compress_file(path, args.level)
+    print(f"Сжатых файлов записано: {counter}")
+
+
+if __name__ == "__main__":
+    main()
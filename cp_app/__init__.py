@@ -1,12 +1,12 @@
 # cp_app/__init__.py
+import os
+
 from flask import Flask, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager, current_user
 from flask_ckeditor import CKEditor
 from settings import Config
-import markdown
-from bleach import clean
 
 # ------------------------------------------------------------------
 # Monkey patch: Flask-Admin + WTForms 3.x совместимость
@@ -44,6 +44,9 @@ login_manager = LoginManager()
 app = Flask(__name__)
 app.config.from_object(Config)
 
+from cp_app.json_provider import FastJSONProvider  # noqa: E402
+app.json = FastJSONProvider(app)
+
 from werkzeug.middleware.proxy_fix import ProxyFix
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -60,21 +63,22 @@ login_manager.login_message = 'Пожалуйста, войдите для до
 # ------------------------------------------------------------------
 # 4.  Вспомогательные константы и фильтры
 # ------------------------------------------------------------------
-ALLOWED_TAGS = [
-    'p', 'br', 'strong', 'em', 'ul', 'ol', 'li',
-    'pre', 'code', 'blockquote', 'h1', 'h2', 'h3',
-    'h4', 'h5', 'h6', 'a'
-]
-
-
-def md_to_html(text: str) -> str:
-    md = markdown.Markdown(extensions=['codehilite', 'fenced_code', 'tables'])
-    html = md.convert(text)
-    safe_html = clean(html, tags=ALLOWED_TAGS, strip=True)
-    return safe_html
-
-
-app.jinja_env.filters['markdown'] = md_to_html
+from cp_app import cache  # noqa: E402
+from cp_app.rendering import (  # noqa: E402
+    ALLOWED_TAGS, RenderCache, SharedRenderStore, md_to_html, renderer
+)
+
+shared_render_store = None
+if app.config['RENDER_CACHE_PATH']:
+    os.makedirs(app.instance_path, exist_ok=True)
+    shared_render_store = SharedRenderStore(
+        os.path.join(app.instance_path, app.config['RENDER_CACHE_PATH'])
+    )
+render_cache = cache.register('markdown', RenderCache(
+    renderer, app.config['RENDER_CACHE_BYTES'], shared=shared_render_store
+))
+
+app.jinja_env.filters['markdown'] = render_cache.render
 app.jinja_env.filters['zip'] = zip
 
 # ------------------------------------------------------------------
@@ -93,23 +97,40 @@ from cp_app import views   # noqa: E402
 from cp_app.quiz import quiz_bp
 app.register_blueprint(quiz_bp)
 from cp_app import api_views, cli_commands, error_handlers  # noqa: E402
-from cp_app.models import Question
+from cp_app import compression  # noqa: E402
+from cp_app.models import Question  # noqa: E402
 
 
-@app.context_processor
-def inject_counts():
-    count = Question.query.count()
+def _question_word(count):
     last_two = count % 100
     if 11 <= last_two <= 14:
-        word = "вопросов"
-    else:
-        rem = count % 10
-        if rem == 1:
-            word = "вопрос"
-        elif 2 <= rem <= 4:
-            word = "вопроса"
-        else:
-            word = "вопросов"
+        return "вопросов"
+    rem = count % 10
+    if rem == 1:
+        return "вопрос"
+    if 2 <= rem <= 4:
+        return "вопроса"
+    return "вопросов"
+
+
+def _load_question_count():
+    count = db.session.scalar(db.select(db.func.count(Question.id)))
+    return count, _question_word(count)
+
+
+question_counter = cache.register('question_count', cache.CachedValue(
+    _load_question_count, ttl=app.config['QUESTION_COUNT_TTL']
+))
+
+
+@cache.on_commit(Question, 'insert', 'delete')
+def _invalidate_question_count(changes):
+    question_counter.invalidate()
+
+
+@app.context_processor
+def inject_counts():
+    count, word = question_counter.get()
     return dict(question_count=count, question_word=word)
 
 # ------------------------------------------------------------------
@@ -117,6 +138,7 @@ def inject_counts():
 # ------------------------------------------------------------------
 from flask_admin import Admin
 from flask_admin.contrib.sqla import ModelView
+from sqlalchemy.orm import load_only, with_expression
 from wtforms import PasswordField
 
 
@@ -152,8 +174,35 @@ class UserAdminView(AdminModelView):
             model.set_password(form.password.data)
 
 
+# Кастомный ModelView для вопросов: HTML рендерится автоматически при записи
+class QuestionAdminView(AdminModelView):
+    column_list = ('id', 'title', 'text', 'updated_at')
+    # В списке вместо ответа целиком — его начало, обрезанное в БД
+    column_formatters = {
+        'text': lambda view, context, model, name: model.text_preview,
+    }
+    form_excluded_columns = (
+        'title_html', 'text_html', 'text_plain', 'updated_at', 'comments'
+    )
+
+    def get_query(self):
+        return super().get_query().options(
+            load_only(Question.id, Question.title, Question.updated_at),
+            with_expression(
+                Question.text_preview,
+                Question.preview_expression(app.config['ADMIN_PREVIEW_LENGTH']),
+            ),
+        )
+
+
+# Кастомный ModelView для тегов: question_count ведёт Tag.recount
+class TagAdminView(AdminModelView):
+    column_list = ('id', 'name', 'question_count')
+    form_excluded_columns = ('question_count',)
+
+
 # Регистрируем модели в админке
 admin.add_view(UserAdminView(User, db.session))
-admin.add_view(AdminModelView(Question, db.session))
+admin.add_view(QuestionAdminView(Question, db.session))
 admin.add_view(AdminModelView(Comment, db.session))
-admin.add_view(AdminModelView(Tag, db.session))
+admin.add_view(TagAdminView(Tag, db.session))
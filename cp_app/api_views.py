@@ -1,18 +1,214 @@
-from flask import jsonify, request
+from collections import defaultdict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
 
-from . import app, db
-from .models import Question
-from .views import random_question
+from flask import Response, jsonify, request, stream_with_context
+from flask_login import current_user
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+
+from . import app, cache, db
+from .cache import cache_stats
+from .compression import matching_etag
+from .models import (
+    CollectionVersion, Question, Tag, question_tags, upsert_insert
+)
+from .rendering import html_to_text, md_to_html
+from .question_pool import question_pool
+from .suggest import suggest_index
+from .tags import (
+    clean_tag_names, question_tag_links, resolve_tag_ids, set_question_tags,
+    sync_tag_links
+)
 
 from .error_handlers import InvalidAPIUsage
 
 
+def _http_date(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _not_modified(etag, last_modified):
+    """Ответ 304, если у клиента актуальная версия, иначе None.
+
+    Проверяется до загрузки и сериализации данных; If-None-Match
+    приоритетнее If-Modified-Since.
+    """
+    if request.if_none_match:
+        # клиент мог получить сжатый вариант — с суффиксом в ETag
+        matched = matching_etag(etag)
+        fresh = matched is not None
+        etag = matched or etag
+    elif request.if_modified_since and last_modified is not None:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return _validated(Response(status=304), etag, last_modified)
+
+
+def _validated(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = _http_date(last_modified)
+    return response
+
+
+def _question_etag(question_id, updated_at):
+    return f'q{question_id}-{updated_at:%Y%m%d%H%M%S%f}'
+
+
+QUESTION_FIELDS = ('id', 'title', 'text', 'tags')
+
+
+def _fields_arg():
+    """Поля из ?fields=title,tags; id возвращается всегда."""
+    raw = request.args.get('fields')
+    if not raw:
+        return QUESTION_FIELDS
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = fields.difference(QUESTION_FIELDS)
+    if unknown:
+        raise InvalidAPIUsage(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}'
+        )
+    return tuple(
+        field for field in QUESTION_FIELDS if field == 'id' or field in fields
+    )
+
+
+def _select_questions(fields):
+    """SELECT только запрошенных колонок вопроса, без ORM-объектов."""
+    return select(*(
+        getattr(Question, field) for field in fields if field != 'tags'
+    ))
+
+
+def _serialize(rows, fields):
+    """Строки проекции в словари; теги — одним запросом, если нужны."""
+    items = [row._asdict() for row in rows]
+    if 'tags' in fields and items:
+        tags = defaultdict(list)
+        for question_id, name in db.session.execute(
+            select(question_tags.c.question_id, Tag.name)
+            .join(Tag, Tag.id == question_tags.c.tag_id)
+            .where(question_tags.c.question_id.in_(
+                [item['id'] for item in items]
+            ))
+            .order_by(Tag.id)
+        ):
+            tags[question_id].append(name)
+        for item in items:
+            item['tags'] = tags[item['id']]
+    return items
+
+
+_CachedResponse = namedtuple(
+    '_CachedResponse', 'body mimetype etag last_modified'
+)
+
+
+def _response_size(key, entry):
+    return len(key[1]) + len(entry.body) + 200
+
+
+def _payload_size(key, payload):
+    return len(payload['title']) + len(payload['text']) + 200
+
+
+# Версия коллекции для ключей кеша: свои записи видны сразу (инвалидация
+# по коммиту), записи других воркеров — не позже чем через API_VERSION_TTL
+api_version = cache.register('api_version', cache.CachedValue(
+    lambda: CollectionVersion.current('question'),
+    ttl=app.config['API_VERSION_TTL'],
+))
+# (версия, путь с query) -> готовый ответ GET
+api_responses = cache.register('api_responses', cache.LRUCache(
+    app.config['API_CACHE_BYTES'], sizeof=_response_size
+))
+# (версия, id) -> to_dict() вопроса для случайного вопроса
+api_questions = cache.register('api_questions', cache.LRUCache(
+    app.config['API_CACHE_BYTES'] // 4, sizeof=_payload_size
+))
+_flights = cache.SingleFlight()
+
+
+@cache.on_commit(Question)
+def _invalidate_api_cache(changes):
+    # Срабатывает и для API, и для админки, и для пакетного импорта
+    api_version.invalidate()
+    api_responses.clear()
+    api_questions.clear()
+
+
+def _cached_get(view):
+    """Кеширует успешные ответы GET по версии коллекции и пути с query.
+
+    Холодный ключ вычисляет один поток воркера, остальные ждут его.
+    Условные запросы к закешированному ответу обслуживаются без БД.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (api_version.get()[0], request.full_path)
+        entry = api_responses.get(key)
+        if entry is None:
+            with _flights.lock(key):
+                entry = api_responses.get(key)
+                if entry is None:
+                    response = app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    etag, _ = response.get_etag()
+                    api_responses.set(key, _CachedResponse(
+                        response.get_data(), response.mimetype, etag,
+                        response.last_modified,
+                    ))
+                    return response
+        not_modified = _not_modified(entry.etag, entry.last_modified)
+        if not_modified is not None:
+            return not_modified
+        return _validated(
+            app.response_class(entry.body, mimetype=entry.mimetype),
+            entry.etag, entry.last_modified,
+        )
+    return wrapper
+
+
 @app.route('/api/questions/<int:id>/', methods=['GET'])
+@_cached_get
 def get_question(id):
-    question = Question.query.get(id)
-    if question is None:
+    # Неверный ?fields= — ошибка и при совпавшем ETag
+    fields = _fields_arg()
+    # Сначала только updated_at: на 304 сама строка не читается
+    updated_at = db.session.scalar(
+        select(Question.updated_at).where(Question.id == id)
+    )
+    if updated_at is None:
         raise InvalidAPIUsage('Вопроса с указанным id не найдено', 404)
-    return jsonify({'question': question.to_dict()}), 200
+    etag = _question_etag(id, updated_at)
+    not_modified = _not_modified(etag, updated_at)
+    if not_modified is not None:
+        return not_modified
+    rows = db.session.execute(
+        _select_questions(fields).where(Question.id == id)
+    ).all()
+    if not rows:
+        raise InvalidAPIUsage('Вопроса с указанным id не найдено', 404)
+    response = jsonify({'question': _serialize(rows, fields)[0]})
+    return _validated(response, etag, updated_at)
+
+
+def _tag_names(data):
+    """Список тегов из тела запроса; None, если поле tags не передано."""
+    if 'tags' not in data:
+        return None
+    tags = data['tags']
+    if not isinstance(tags, list) or \
+            not all(isinstance(name, str) for name in tags):
+        raise InvalidAPIUsage('tags должен быть списком строк')
+    return tags
 
 
 @app.route('/api/questions/<int:id>/', methods=['PATCH'])
@@ -21,8 +217,11 @@ def update_question(id):
     question = Question.query.get(id)
     if question is None:
         raise InvalidAPIUsage('Вопрос с указанным id не найден', 404)
+    tags = _tag_names(data)
     question.title = data.get('title', question.title)
     question.text = data.get('text', question.text)
+    if tags is not None:
+        set_question_tags(question, tags)
     db.session.commit()
     return jsonify({'question': question.to_dict()}), 200
 
@@ -37,11 +236,120 @@ def delete_question(id):
     return '', 204
 
 
+def _int_arg(name, default, minimum=0, maximum=None):
+    raw = request.args.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise InvalidAPIUsage(f'Параметр {name} должен быть целым числом')
+    if value < minimum or (maximum is not None and value > maximum):
+        raise InvalidAPIUsage(
+            f'Параметр {name} вне допустимого диапазона'
+        )
+    return value
+
+
+def _batch_response(ids, fields):
+    """Вопросы по списку id одним IN-запросом, в порядке запроса.
+
+    Ненайденные id перечисляются в missing и не ломают весь ответ.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise InvalidAPIUsage('Не переданы id вопросов')
+    if len(ids) > app.config['API_BATCH_MAX']:
+        raise InvalidAPIUsage(
+            f'За раз можно запросить не больше '
+            f'{app.config["API_BATCH_MAX"]} вопросов'
+        )
+    found = {
+        item['id']: item for item in _serialize(db.session.execute(
+            _select_questions(fields).where(Question.id.in_(ids))
+        ), fields)
+    }
+    return jsonify({
+        'questions': [found[id] for id in ids if id in found],
+        'missing': [id for id in ids if id not in found],
+    })
+
+
+def _parse_ids(values):
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise InvalidAPIUsage('id вопросов должны быть целыми числами')
+
+
+def _stream_questions(after_id, fields):
+    """NDJSON-выгрузка: по одной строке JSON на вопрос.
+
+    Строки читаются пачками через yield_per (на PostgreSQL — серверным
+    курсором), так что память воркера не зависит от размера таблицы.
+    """
+    query = (
+        _select_questions(fields)
+        .where(Question.id > after_id)
+        .order_by(Question.id)
+        .execution_options(yield_per=app.config['API_STREAM_BATCH'])
+    )
+
+    def generate():
+        for rows in db.session.execute(query).partitions():
+            for item in _serialize(rows, fields):
+                yield app.json.dumps(item) + '\n'
+
+    return Response(
+        stream_with_context(generate()), mimetype='application/x-ndjson'
+    )
+
+
 @app.route('/api/questions/', methods=['GET'])
+@_cached_get
 def get_questions():
-    questions = Question.query.all()
-    questions_list = [question.to_dict() for question in questions]
-    return jsonify({'questions': questions_list}), 200
+    """Страница вопросов по курсору: ?after_id=<id>&limit=<n>.
+
+    В ответе next — значение after_id для следующей страницы или None.
+    С ?format=ndjson вся выборка после after_id отдаётся потоком,
+    с ?ids=1,2,3 — только перечисленные вопросы, ?fields=id,title
+    ограничивает набор полей.
+    """
+    after_id = _int_arg('after_id', 0)
+    fields = _fields_arg()
+    response_format = request.args.get('format', 'json')
+    if response_format not in ('json', 'ndjson'):
+        raise InvalidAPIUsage('Поддерживаются форматы json и ndjson')
+    limit = _int_arg('limit', app.config['API_PAGE_SIZE'], minimum=1,
+                     maximum=app.config['API_MAX_PAGE_SIZE'])
+    # Любая правка вопросов меняет версию коллекции, а с ней и ETag
+    # всех страниц; параметры запроса входят в URL и в ETag не нужны
+    version, updated_at = CollectionVersion.current('question')
+    etag = f'questions-{version}'
+    not_modified = _not_modified(etag, updated_at)
+    if not_modified is not None:
+        return not_modified
+    if 'ids' in request.args:
+        raw_ids = ','.join(request.args.getlist('ids')).split(',')
+        ids = _parse_ids(raw_id for raw_id in raw_ids if raw_id.strip())
+        return _validated(_batch_response(ids, fields), etag, updated_at)
+    if response_format == 'ndjson':
+        return _validated(
+            _stream_questions(after_id, fields), etag, updated_at
+        )
+    rows = db.session.execute(
+        _select_questions(fields)
+        .where(Question.id > after_id)
+        .order_by(Question.id)
+        .limit(limit + 1)
+    ).all()
+    next_after_id = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1].id
+    questions_list = _serialize(rows, fields)
+    response = jsonify({'questions': questions_list, 'next': next_after_id})
+    return _validated(response, etag, updated_at)
 
 
 @app.route('/api/questions/', methods=['POST'])
@@ -51,16 +359,209 @@ def add_question():
         raise InvalidAPIUsage('В запросе отсутствуют обязательные поля')
     if Question.query.filter_by(title=data['title']).first() is not None:
         raise InvalidAPIUsage('Такой вопрос уже есть в базе данных')
+    tags = _tag_names(data)
     question = Question()
     question.from_dict(data)
+    if tags:
+        set_question_tags(question, tags)
     db.session.add(question)
     db.session.commit()
     return jsonify({'question': question.to_dict()}), 201
 
 
+@app.route('/api/questions/batch', methods=['POST'])
+def get_questions_batch():
+    """То же, что ?ids=, для длинных списков: {"ids": [1, 2, 3]}.
+
+    Набор полей задаётся так же, через ?fields= в строке запроса.
+    """
+    fields = _fields_arg()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('ids'), list):
+        raise InvalidAPIUsage('В запросе отсутствует список ids')
+    if not all(type(value) is int for value in data['ids']):
+        raise InvalidAPIUsage('id вопросов должны быть целыми числами')
+    return _batch_response(data['ids'], fields), 200
+
+
+def _bulk_item_error(item):
+    if not isinstance(item, dict):
+        return 'Элемент должен быть объектом'
+    if not isinstance(item.get('title'), str) or \
+            not isinstance(item.get('text'), str):
+        return 'В запросе отсутствуют обязательные поля'
+    if not item['title'].strip() or not item['text'].strip():
+        return 'Заголовок и текст не могут быть пустыми'
+    if len(item['title']) > Question.title.type.length:
+        return 'Слишком длинный заголовок'
+    tags = item.get('tags', [])
+    if not isinstance(tags, list) or \
+            not all(isinstance(name, str) for name in tags):
+        return 'tags должен быть списком строк'
+    if any(len(name.strip()) > Tag.name.type.length for name in tags):
+        return 'Слишком длинное имя тега'
+    return None
+
+
+@app.route('/api/questions/bulk', methods=['POST'])
+def bulk_upsert_questions():
+    """Импорт массива вопросов с upsert по title в одной транзакции.
+
+    Для каждого элемента возвращается статус created, updated или
+    skipped: вопрос не изменился, повторяется в запросе или содержит
+    ошибку (тогда она в поле error).
+    """
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise InvalidAPIUsage('Ожидается непустой массив вопросов')
+    if len(items) > app.config['API_BULK_MAX']:
+        raise InvalidAPIUsage(
+            f'За раз можно импортировать не больше '
+            f'{app.config["API_BULK_MAX"]} вопросов'
+        )
+
+    results = [None] * len(items)
+    titles, texts = {}, set()
+    for n, item in enumerate(items):
+        error = _bulk_item_error(item)
+        if error is None and (item['title'] in titles or
+                              item['text'] in texts):
+            error = 'Вопрос повторяется в запросе'
+        if error is not None:
+            title = item.get('title') if isinstance(item, dict) else None
+            results[n] = dict(title=title, status='skipped', error=error)
+            continue
+        titles[item['title']] = n
+        texts.add(item['text'])
+
+    # Один запрос на все уже существующие вопросы с такими title или text
+    existing = db.session.execute(
+        select(Question.id, Question.title, Question.text).where(
+            or_(Question.title.in_(titles), Question.text.in_(texts))
+        )
+    ).all() if titles else []
+    by_title = {row.title: row for row in existing}
+    by_text = {row.text: row for row in existing}
+    links = question_tag_links([row.id for row in existing])
+
+    now = datetime.utcnow()
+    upserts, tag_names = [], {}
+    for title, n in titles.items():
+        item = items[n]
+        row = by_title.get(title)
+        other = by_text.get(item['text'])
+        if other is not None and other.title != title:
+            results[n] = dict(title=title, status='skipped',
+                              error='Такой текст уже есть у другого вопроса')
+            continue
+        names = clean_tag_names(item['tags']) if 'tags' in item else None
+        if row is None:
+            status = 'created'
+        elif row.text == item['text'] and \
+                (names is None or set(names) == set(links[row.id])):
+            results[n] = dict(title=title, status='skipped', id=row.id)
+            continue
+        else:
+            status = 'updated'
+        results[n] = dict(title=title, status=status)
+        if names is not None:
+            tag_names[title] = names
+        # Core-вставка не вызывает before_insert, поэтому HTML рендерим здесь
+        text_html = md_to_html(item['text'])
+        upserts.append(dict(
+            title=title,
+            text=item['text'],
+            title_html=md_to_html(title),
+            text_html=text_html,
+            text_plain=html_to_text(text_html),
+            updated_at=now,
+        ))
+
+    if upserts:
+        table = Question.__table__
+        stmt = upsert_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['title'],
+            set_={column: stmt.excluded[column] for column in
+                  ('text', 'title_html', 'text_html', 'text_plain',
+                   'updated_at')},
+        ).returning(table.c.id, table.c.title)
+        try:
+            ids = {
+                title: id for id, title in db.session.execute(stmt, upserts)
+            }
+            tag_ids = resolve_tag_ids(
+                name for names in tag_names.values() for name in names
+            )
+            sync_tag_links(
+                {ids[title]: {tag_ids[name] for name in names}
+                 for title, names in tag_names.items()},
+                {question_id: set(current.values())
+                 for question_id, current in links.items()},
+            )
+        except IntegrityError:
+            db.session.rollback()
+            raise InvalidAPIUsage(
+                'Импорт конфликтует с одновременным изменением вопросов', 409
+            )
+        for result in results:
+            if result['status'] in ('created', 'updated'):
+                result['id'] = ids[result['title']]
+                action = 'insert' if result['status'] == 'created' else 'update'
+                # события маппера для Core-записи не срабатывают
+                cache.record_change(db.session, Question, action, result['id'])
+        CollectionVersion.bump(db.session.connection(), 'question', now)
+        db.session.commit()
+
+    counts = {status: 0 for status in ('created', 'updated', 'skipped')}
+    for result in results:
+        counts[result['status']] += 1
+    return jsonify({'results': results, **counts}), 200
+
+
+def _question_payload(question_id):
+    key = (api_version.get()[0], question_id)
+    payload = api_questions.get(key)
+    if payload is None:
+        with _flights.lock(key):
+            payload = api_questions.get(key)
+            if payload is None:
+                question = db.session.get(Question, question_id)
+                if question is None:
+                    return None
+                payload = question.to_dict()
+                api_questions.set(key, payload)
+    return payload
+
+
 @app.route('/api/get-random-question/', methods=['GET'])
 def get_random_question():
-    question = random_question()
+    # id берётся из пула, а сам вопрос — из кеша, пока он не изменился
+    question = question_pool.random_question(loader=_question_payload)
     if question is not None:
-        return jsonify({'opinion': question.to_dict()}), 200
+        return jsonify({'opinion': question}), 200
     raise InvalidAPIUsage('В базе данных нет мнений', 404)
+
+
+@app.route('/api/suggest', methods=['GET'])
+def get_suggestions():
+    """Подсказки для поиска и поля тегов: ?q=<префикс>&limit=<n>.
+
+    Ищет по индексу в памяти воркера, без запросов к БД.
+    """
+    limit = _int_arg('limit', app.config['SUGGEST_LIMIT'], minimum=1,
+                     maximum=app.config['SUGGEST_MAX_LIMIT'])
+    query = request.args.get('q', '')[:Question.title.type.length]
+    questions, tags = suggest_index.suggest(query, limit)
+    return jsonify({'questions': questions, 'tags': tags}), 200
+
+
+@app.route('/api/cache-stats/', methods=['GET'])
+def get_cache_stats():
+    """Счётчики попаданий/промахов/вытеснений кешей этого воркера.
+
+    Только для администраторов: раскрывает устройство и нагрузку воркера.
+    """
+    if not current_user.is_authenticated or not current_user.is_admin:
+        raise InvalidAPIUsage('Доступ только для администраторов', 403)
+    return jsonify({'caches': cache_stats()}), 200
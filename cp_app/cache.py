@@ -0,0 +1,226 @@
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from . import db
+
+# Все кеши процесса по имени: для статистики и сброса в тестах
+_registry = {}
+# (модель, 'insert' | 'update' | 'delete') -> подписчики on_commit
+_subscribers = defaultdict(list)
+_MISSING = object()
+
+
+def register(name, cache):
+    _registry[name] = cache
+    return cache
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def clear_caches():
+    for cache in _registry.values():
+        cache.clear()
+
+
+def sizeof(key, value):
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кеш с ограничением по суммарному размеру в байтах."""
+
+    def __init__(self, max_bytes, sizeof=sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            items=len(self._data),
+            bytes=self.size,
+            max_bytes=self.max_bytes,
+        )
+
+
+class CachedValue:
+    """Одно вычисляемое значение с TTL и явной инвалидацией.
+
+    TTL подстраховывает от изменений, сделанных другими воркерами:
+    события SQLAlchemy видит только процесс, который сделал коммит.
+    """
+
+    def __init__(self, loader, ttl):
+        self.loader = loader
+        self.ttl = ttl
+        self._value = _MISSING
+        self._expires = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self):
+        if self._value is not _MISSING and time.monotonic() < self._expires:
+            self.hits += 1
+            return self._value
+        self.misses += 1
+        generation = self._generation
+        value = self.loader()
+        with self._lock:
+            # Если за время загрузки значение инвалидировали, не кешируем его
+            if generation == self._generation:
+                self._value = value
+                self._expires = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = _MISSING
+            self._generation += 1
+            self.invalidations += 1
+
+    clear = invalidate
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            ttl=self.ttl,
+        )
+
+
+class SingleFlight:
+    """Поштучные блокировки по ключу: холодный ключ вычисляет один поток.
+
+    Остальные потоки воркера ждут его и затем берут готовое значение
+    из кеша, а не идут в БД следом.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lock(self, key):
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+def record_change(session, model, action, pk):
+    """Запоминает изменение до коммита сессии.
+
+    Вызывается ORM-событиями, а также вручную из путей, которые пишут
+    в БД через Core и не порождают событий маппера.
+    """
+    session.info.setdefault('cache_changes', []).append((model, action, pk))
+
+
+def _recorder(model, action):
+    def listener(mapper, connection, target):
+        pk = mapper.primary_key_from_instance(target)
+        record_change(object_session(target), model, action, pk[0])
+    return listener
+
+
+def on_commit(model, *actions):
+    """Подписывает callback(changes) на закоммиченные изменения модели.
+
+    changes — список пар (action, pk), action: 'insert', 'update', 'delete'.
+    """
+    actions = actions or ('insert', 'update', 'delete')
+
+    def decorator(callback):
+        for action in actions:
+            key = (model, action)
+            if key not in _subscribers:
+                event.listen(model, f'after_{action}', _recorder(model, action))
+            _subscribers[key].append(callback)
+        return callback
+    return decorator
+
+
+@event.listens_for(db.session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop('cache_changes', None)
+    if not changes:
+        return
+    grouped = {}
+    for model, action, pk in changes:
+        for callback in _subscribers[(model, action)]:
+            grouped.setdefault(callback, []).append((action, pk))
+    for callback, items in grouped.items():
+        callback(items)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_changes(session):
+    session.info.pop('cache_changes', None)
@@ -1,9 +1,14 @@
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import click
+from sqlalchemy import or_, select, update
 
 from . import app, db
 from .models import Question
+from .quiz_store import quiz_store
+from .rendering import html_to_text, md_to_html
 
 
 @app.cli.command('load_questions')
@@ -18,3 +23,60 @@ def load_opinions_command():
             db.session.commit()
             counter += 1
     click.echo(f'Загружено мнений: {counter}')
+
+
+def _render_row(row):
+    """Рендерит одну строку (id, title, text) — выполняется в дочернем процессе."""
+    question_id, title, text = row
+    text_html = md_to_html(text)
+    return dict(
+        id=question_id,
+        title_html=md_to_html(title),
+        text_html=text_html,
+        text_plain=html_to_text(text_html),
+    )
+
+
+@app.cli.command('render_questions')
+@click.option('--workers', default=os.cpu_count(), show_default=True,
+              help='Количество процессов для рендеринга.')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Сколько вопросов обновлять за одну транзакцию.')
+@click.option('--force', is_flag=True,
+              help='Перерендерить все вопросы, а не только пустые.')
+def render_questions_command(workers, batch_size, force):
+    """Заполняет title_html/text_html/text_plain у существующих вопросов."""
+    query = select(Question.id, Question.title, Question.text).order_by(
+        Question.id
+    )
+    if not force:
+        query = query.where(or_(Question.title_html.is_(None),
+                                Question.text_html.is_(None),
+                                Question.text_plain.is_(None)))
+
+    counter = 0
+    last_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rows = db.session.execute(
+                query.where(Question.id > last_id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            rendered = list(pool.map(
+                _render_row, [tuple(row) for row in rows],
+                chunksize=max(1, len(rows) // (workers * 4))
+            ))
+            # bulk UPDATE по первичному ключу, без загрузки ORM-объектов
+            db.session.execute(update(Question), rendered)
+            db.session.commit()
+            counter += len(rendered)
+    click.echo(f'Отрендерено вопросов: {counter}')
+
+
+@app.cli.command('purge_quizzes')
+def purge_quizzes_command():
+    """Удаляет брошенные квизы с истёкшим сроком жизни."""
+    counter = quiz_store().purge_expired()
+    click.echo(f'Удалено квизов: {counter}')
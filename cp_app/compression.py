@@ -0,0 +1,94 @@
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+from . import app
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него отдаём только gzip
+    brotli = None
+
+# Суффиксы ETag сжатых вариантов: у разных кодировок разные байты,
+# поэтому и сильные ETag должны различаться
+ETAG_SUFFIXES = {'gzip': '-gzip', 'br': '-br'}
+# Предсжатые файлы статики, которые пишет compress_static.py
+STATIC_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'])
+
+
+def matching_etag(etag):
+    """Вариант etag из If-None-Match запроса (с суффиксом сжатия или без)."""
+    for suffix in ('', *ETAG_SUFFIXES.values()):
+        if request.if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+@app.after_request
+def compress_response(response):
+    """Сжимает HTML и JSON крупнее COMPRESS_MIN_SIZE по Accept-Encoding.
+
+    Потоковые ответы и файлы (send_file) не трогаем: статика сжимается
+    заранее, а NDJSON-выгрузку пришлось бы целиком держать в памяти.
+    """
+    if response.mimetype not in app.config['COMPRESS_MIMETYPES'] or \
+            response.status_code < 200 or response.status_code == 204 or \
+            response.status_code >= 300 or response.is_streamed or \
+            response.direct_passthrough or \
+            'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+    response.set_data(_compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag + ETAG_SUFFIXES[encoding], weak)
+    return response
+
+
+def send_static(filename):
+    """Статика с подменой на предсжатый .br/.gz файл, если он есть."""
+    accepted = [
+        encoding for encoding in STATIC_SUFFIXES
+        if request.accept_encodings.quality(encoding) > 0
+    ]
+    # Диапазоны байтов считаются по исходному файлу, их не подменяем
+    if accepted and request.range is None:
+        for encoding in accepted:
+            name = filename + STATIC_SUFFIXES[encoding]
+            path = safe_join(app.static_folder, name)
+            if path is None or not os.path.isfile(path):
+                continue
+            response = send_from_directory(
+                app.static_folder, name,
+                mimetype=mimetypes.guess_type(filename)[0],
+                max_age=app.get_send_file_max_age(filename),
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    response = app.send_static_file(filename)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+app.view_functions['static'] = send_static
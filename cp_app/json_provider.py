@@ -0,0 +1,50 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # без orjson работает стандартный json
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON-провайдер на orjson с откатом на стандартный провайдер Flask.
+
+    Словари из to_dict() (int, str, списки) orjson сериализует сам.
+    Даты, Decimal и объекты с __html__ уходят в DefaultJSONProvider.default,
+    поэтому вывод совпадает с выводом без orjson, кроме экранирования
+    не-ASCII символов: orjson пишет UTF-8 как есть.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _dumps_bytes(self, obj, indent=False):
+        return orjson.dumps(
+            obj, default=self.default, option=self._options(indent)
+        )
+
+    def dumps(self, obj, **kwargs):
+        # Нестандартные аргументы json.dumps orjson не поддерживает
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or \
+            self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype
+        )
@@ -1,28 +1,63 @@
 from datetime import datetime
 
 from flask_login import UserMixin
+from sqlalchemy.dialects import postgresql, sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from . import db
+from . import cache, db
+from .rendering import html_to_text, md_to_html
+
+# insert() с поддержкой ON CONFLICT для используемых нами СУБД
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
 
 # Связующая таблица "многие-ко-многим" между вопросами и тегами
 question_tags = db.Table(
     'question_tags',
     db.Column('question_id', db.Integer, db.ForeignKey('question.id'), primary_key=True),
     db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    # Первичный ключ начинается с question_id; для выборки вопросов по тегу
+    # нужен обратный порядок
+    db.Index('ix_question_tags_tag_id_question_id', 'tag_id', 'question_id'),
 )
 
 
+def upsert_insert(table):
+    """INSERT диалекта текущей БД, поддерживающий on_conflict_do_*."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise NotImplementedError(f'ON CONFLICT не поддерживается: {dialect}')
+    return _UPSERT_INSERTS[dialect](table)
+
+
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(128), nullable=False, unique=True)
     text = db.Column(db.Text, unique=True, nullable=False)
+    # Предварительно отрендеренный HTML, заполняется при записи
+    title_html = db.Column(db.Text)
+    text_html = db.Column(db.Text)
+    # Ответ без разметки: его индексирует и из него режет сниппеты поиск
+    text_plain = db.Column(db.Text)
+    # Меняется при любой правке, видимой в API (включая теги): для ETag
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow
+    )
     tags = db.relationship(
         'Tag',
         secondary=question_tags,
         backref=db.backref('questions', lazy='select'),
         lazy='select'
     )
+    # Начало ответа для списков, заполняется запросом через with_expression
+    text_preview = db.query_expression()
+
+    @classmethod
+    def preview_expression(cls, length):
+        """Первые length символов ответа: обрезаются в БД, а не в Python."""
+        return db.func.substr(cls.text, 1, length)
 
     def to_dict(self):
         return dict(
@@ -37,14 +72,167 @@ class Question(db.Model):
             if field in data:
                 setattr(self, field, data[field])
 
+    def render_html(self, force=False):
+        """Обновляет title_html/text_html/text_plain при изменении текста."""
+        state = db.inspect(self)
+        if force or self.title_html is None or \
+                state.attrs.title.history.has_changes():
+            self.title_html = md_to_html(self.title)
+        if force or self.text_html is None or \
+                state.attrs.text.history.has_changes():
+            self.text_html = md_to_html(self.text)
+            self.text_plain = html_to_text(self.text_html)
+        elif self.text_plain is None:
+            self.text_plain = html_to_text(self.text_html)
+
+
+@db.event.listens_for(Question, 'before_insert')
+@db.event.listens_for(Question, 'before_update')
+def _render_question_html(mapper, connection, target):
+    # Срабатывает для вьюх, API, Flask-Admin и CLI: HTML всегда свежий
+    target.render_html()
+
+
+class CollectionVersion(db.Model):
+    """Счётчик изменений коллекции: из него строится ETag списков в API."""
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    @classmethod
+    def bump(cls, connection, name, now=None):
+        """Увеличивает версию в текущей транзакции.
+
+        Пути, которые пишут вопросы через Core, вызывают его сами.
+        """
+        table = cls.__table__
+        now = now or datetime.utcnow()
+        result = connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(
+                table.insert().values(name=name, version=1, updated_at=now)
+            )
+
+    @classmethod
+    def current(cls, name):
+        """(version, updated_at) коллекции; (0, None), если правок не было."""
+        row = db.session.execute(
+            db.select(cls.version, cls.updated_at).where(cls.name == name)
+        ).first()
+        return tuple(row) if row is not None else (0, None)
+
 
 class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    # Число вопросов с тегом, пересчитывается при изменении связей
+    question_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
 
     def __repr__(self):
         return f'<Tag {self.name}>'
 
+    @classmethod
+    def recount(cls, connection, tag_ids):
+        """Пересчитывает question_count тегов tag_ids.
+
+        Строки тегов сначала блокируются (в порядке id — без взаимных
+        блокировок): в READ COMMITTED UPDATE после ожидания блокировки
+        посчитал бы связи по старому снимку и потерял бы связи, которые
+        параллельная транзакция добавила к тому же тегу. Следующий
+        оператор видит уже её коммит. На SQLite FOR UPDATE не нужен:
+        писатель там один.
+        Пути, которые меняют question_tags через Core, вызывают его сами.
+        """
+        if not tag_ids:
+            return
+        table = cls.__table__
+        connection.execute(
+            db.select(table.c.id)
+            .where(table.c.id.in_(tag_ids))
+            .order_by(table.c.id)
+            .with_for_update()
+        )
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_(tag_ids))
+            .values(question_count=db.select(db.func.count())
+                    .where(question_tags.c.tag_id == table.c.id)
+                    .scalar_subquery())
+        )
+
+
+@db.event.listens_for(db.session, 'before_flush')
+def _touch_questions(session, flush_context, instances):
+    """Обновляет updated_at вопросов и версию коллекции 'question'."""
+    now = datetime.utcnow()
+    touched = set()
+    changed = False
+    for obj in session.new:
+        changed = changed or isinstance(obj, Question)
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            changed = True
+        elif isinstance(obj, Tag):
+            touched.update(obj.questions)
+    for obj in session.dirty:
+        if isinstance(obj, Question) and session.is_modified(obj):
+            # is_modified учитывает и изменения коллекции tags
+            touched.add(obj)
+        elif isinstance(obj, Tag) and \
+                db.inspect(obj).attrs.name.history.has_changes():
+            touched.update(obj.questions)
+    for question in touched:
+        if question not in session.deleted:
+            question.updated_at = now
+    if changed or touched:
+        CollectionVersion.bump(session.connection(), 'question', now)
+
+
+@db.event.listens_for(db.session, 'before_flush')
+def _collect_tag_changes(session, flush_context, instances):
+    """Запоминает теги, у которых меняется набор вопросов."""
+    tags = session.info.setdefault('recount_tags', set())
+    for obj in session.new:
+        if isinstance(obj, Question):
+            tags.update(obj.tags)
+        elif isinstance(obj, Tag):
+            tags.add(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Question):
+            tags.update(obj.tags)
+    for obj in session.dirty:
+        if isinstance(obj, Question):
+            history = db.inspect(obj).attrs.tags.history
+            tags.update(history.added)
+            tags.update(history.deleted)
+        elif isinstance(obj, Tag) and \
+                db.inspect(obj).attrs.questions.history.has_changes():
+            tags.add(obj)
+
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def _recount_tags(session, flush_context):
+    tags = session.info.pop('recount_tags', None)
+    if not tags:
+        return
+    # Объекты из кеша сессии не знают о пересчёте в БД
+    tag_ids = set()
+    for tag in tags:
+        if db.inspect(tag).persistent:
+            tag_ids.add(tag.id)
+            session.expire(tag, ['question_count'])
+    Tag.recount(session.connection(), tag_ids)
+    for tag_id in tag_ids:
+        cache.record_change(session, Tag, 'update', tag_id)
+
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -63,7 +251,7 @@ class User(UserMixin, db.Model):
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     question_id = db.Column(
         db.Integer, db.ForeignKey('question.id'), nullable=False
@@ -71,3 +259,10 @@ class Comment(db.Model):
 
     user = db.relationship('User', backref='comments')
     question = db.relationship('Question', backref='comments')
+
+
+class QuizSession(db.Model):
+    """Серверное состояние квиза; в cookie хранится только id."""
+    id = db.Column(db.String(32), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
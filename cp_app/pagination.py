@@ -0,0 +1,157 @@
+import math
+import time
+
+from sqlalchemy import select, text
+
+from . import app, cache, db
+from .models import Question
+
+# Число строк по фильтру (поиск, тег) -> (число, момент устаревания)
+filter_counts = cache.register('filter_counts', cache.LRUCache(
+    max_bytes=app.config['LIST_COUNT_CACHE_BYTES'],
+))
+
+
+@cache.on_commit(Question)
+def _invalidate_filter_counts(changes):
+    # Смена тегов и переименование тега тоже обновляют вопрос (updated_at)
+    filter_counts.clear()
+
+
+def _estimated_total():
+    """Оценка числа вопросов из статистики планировщика PostgreSQL.
+
+    None, если оценки нет (таблицу ещё не анализировали) или таблица
+    слишком мала, чтобы точный COUNT(*) был заметен.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return None
+    estimate = db.session.scalar(text(
+        "SELECT reltuples::bigint FROM pg_class "
+        "WHERE oid = 'question'::regclass"
+    ))
+    if estimate is None or estimate < app.config['LIST_ESTIMATE_MIN']:
+        return None
+    return estimate
+
+
+def cached_count(key, loader, fresh=False):
+    """Число строк по фильтру key: из кеша, иначе loader().
+
+    TTL ловит записи других воркеров, свои записи сбрасывают кеш сразу.
+    fresh=True — всегда вызвать loader() и обновить кеш.
+    """
+    now = time.monotonic()
+    entry = None if fresh else filter_counts.get(key)
+    if entry is not None and now < entry[1]:
+        return entry[0]
+    count = loader()
+    filter_counts.set(key, (count, now + app.config['LIST_COUNT_TTL']))
+    return count
+
+
+def count_questions(statement, key, estimate=False, exact=False):
+    """Число вопросов в выборке statement.
+
+    estimate=True — выборка без фильтров, на PostgreSQL хватает оценки.
+    exact=True — точный COUNT(*) мимо кеша и оценки.
+    """
+    def load():
+        if estimate and not exact:
+            total = _estimated_total()
+            if total is not None:
+                return total
+        return db.session.scalar(
+            select(db.func.count()).select_from(
+                statement.with_only_columns(Question.id).subquery())
+        )
+    return cached_count(key, load, fresh=exact)
+
+
+class KeysetPagination:
+    """Страница списка вопросов с переходом по курсору Question.id.
+
+    Вместо OFFSET страница ищется от id соседней: ?after=<id> — строки
+    после него, ?before=<id> — перед ним, ?last=1 — последняя страница.
+    Для ссылок через страницу добавляется ?skip=<n> (не больше MAX_SKIP
+    страниц), поэтому глубокая страница стоит как первая. Номер страницы
+    в URL нужен только для нумерации, общее число берётся из кеша
+    (кроме последней страницы: для неё оно считается точно).
+    Ссылки на страницы строит link_args(), как и у SearchPagination.
+    """
+
+    MAX_SKIP = 2
+
+    def __init__(self, statement, count_key, page=1, per_page=20,
+                 after=None, before=None, skip=0, last=False,
+                 estimate=False):
+        self.per_page = per_page
+        # Размер и номер последней страницы считаются от общего числа,
+        # поэтому для неё кеш (записи других воркеров) и оценка не годятся
+        self.total = count_questions(statement, count_key, estimate,
+                                     exact=last)
+        self.pages = max(1, math.ceil(self.total / per_page))
+        skip = min(max(skip, 0), self.MAX_SKIP) * per_page
+        limit = per_page + 1  # лишняя строка — признак следующей страницы
+
+        if last:
+            self.page = self.pages
+            limit = self.total - (self.pages - 1) * per_page or per_page
+            rows = self._fetch(statement.order_by(Question.id.desc()), limit)
+            self.items, self.has_prev = rows[::-1], self.pages > 1
+            self.has_next = False
+        elif before is not None:
+            self.page = max(page, 1)
+            rows = self._fetch(
+                statement.where(Question.id < before)
+                .order_by(Question.id.desc()).offset(skip), limit,
+            )
+            self.items = rows[:per_page][::-1]
+            self.has_prev, self.has_next = len(rows) > per_page, True
+        else:
+            if after is None:
+                # Старые ссылки ?page=N без курсора: обычный OFFSET
+                skip = (max(page, 1) - 1) * per_page
+            else:
+                statement = statement.where(Question.id > after)
+            self.page = max(page, 1)
+            rows = self._fetch(
+                statement.order_by(Question.id).offset(skip), limit
+            )
+            self.items = rows[:per_page]
+            self.has_next = len(rows) > per_page
+            self.has_prev = self.page > 1
+
+        # Счётчик из кеша и номер из URL могут не совпадать с выборкой
+        self.page = max(self.page, 1 + self.has_prev) if self.has_prev else 1
+        self.pages = max(self.pages, self.page + self.has_next)
+        if not self.has_next:
+            self.pages = self.page
+
+    @staticmethod
+    def _fetch(statement, limit):
+        return db.session.scalars(statement.limit(limit)).all()
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def link_args(self, page):
+        """Параметры URL для перехода на страницу page с текущей."""
+        if page <= 1 or not self.items:
+            return {}
+        if page >= self.pages:
+            return {'page': self.pages, 'last': 1}
+        if page > self.page:
+            args = {'page': page, 'after': self.items[-1].id}
+            skip = page - self.page - 1
+        else:
+            args = {'page': page, 'before': self.items[0].id}
+            skip = self.page - page - 1
+        if skip:
+            args['skip'] = skip
+        return args
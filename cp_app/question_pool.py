@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import select
+
+from . import app, cache, db
+from .models import Question
+
+
+class QuestionIdPool:
+    """Компактный массив id вопросов для случайной выборки за O(1).
+
+    Свои вставки и удаления пул узнаёт из событий SQLAlchemy, новые
+    вопросы других воркеров — догрузкой id выше «водяного знака» max_id,
+    а чужие удаления — при промахе выборки и периодической полной
+    перезагрузке.
+    """
+
+    def __init__(self, refresh_interval, reload_interval):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._ids = array('i')
+        self._max_id = 0
+        self._loaded_at = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.catch_ups = 0
+        self.stale_picks = 0
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._ids)
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None or \
+                now - self._loaded_at > self.reload_interval:
+            self.reload()
+        elif now - self._checked_at > self.refresh_interval:
+            self._catch_up()
+
+    def reload(self):
+        ids = array('i', db.session.scalars(
+            select(Question.id).order_by(Question.id)
+        ))
+        with self._lock:
+            self._ids = ids
+            self._max_id = ids[-1] if ids else 0
+            self._loaded_at = self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    def _catch_up(self):
+        new_ids = db.session.scalars(
+            select(Question.id)
+            .where(Question.id > self._max_id)
+            .order_by(Question.id)
+        ).all()
+        self._checked_at = time.monotonic()
+        self.catch_ups += 1
+        if new_ids:
+            self.add(new_ids)
+            self._max_id = new_ids[-1]
+
+    def add(self, ids):
+        # Водяной знак двигает только _catch_up: id из событий этого процесса
+        # могут обогнать ещё не увиденные вставки других воркеров
+        with self._lock:
+            for question_id in ids:
+                if not self._ids or question_id > self._ids[-1]:
+                    self._ids.append(question_id)
+                    continue
+                pos = bisect_left(self._ids, question_id)
+                if self._ids[pos] != question_id:
+                    self._ids.insert(pos, question_id)
+
+    def discard(self, ids):
+        with self._lock:
+            for question_id in ids:
+                pos = bisect_left(self._ids, question_id)
+                if pos < len(self._ids) and self._ids[pos] == question_id:
+                    del self._ids[pos]
+
+    def choice(self):
+        """Случайный id или None, если вопросов нет."""
+        self._ensure_fresh()
+        with self._lock:
+            if not self._ids:
+                return None
+            return self._ids[random.randrange(len(self._ids))]
+
+    def sample(self, k):
+        """До k случайных неповторяющихся id."""
+        self._ensure_fresh()
+        with self._lock:
+            return random.sample(self._ids, k=min(k, len(self._ids)))
+
+    def random_question(self, attempts=3, loader=None):
+        """Случайный вопрос одним запросом по первичному ключу.
+
+        loader(question_id) позволяет брать вопрос не из БД, а, например,
+        из кеша; None означает, что вопроса нет.
+        """
+        loader = loader or (lambda pk: db.session.get(Question, pk))
+        for attempt in range(attempts):
+            question_id = self.choice()
+            if question_id is None:
+                return None
+            question = loader(question_id)
+            if question is not None:
+                return question
+            # вопрос удалили в другом воркере
+            self.stale_picks += 1
+            self.discard([question_id])
+            if attempt == attempts - 2:
+                self.reload()
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._ids = array('i')
+            self._max_id = 0
+            self._loaded_at = None
+
+    def stats(self):
+        return dict(
+            size=len(self._ids),
+            max_id=self._max_id,
+            reloads=self.reloads,
+            catch_ups=self.catch_ups,
+            stale_picks=self.stale_picks,
+        )
+
+
+question_pool = cache.register('question_pool', QuestionIdPool(
+    refresh_interval=app.config['QUESTION_POOL_REFRESH'],
+    reload_interval=app.config['QUESTION_POOL_RELOAD'],
+))
+
+
+@cache.on_commit(Question, 'insert', 'delete')
+def _sync_question_pool(changes):
+    question_pool.add(pk for action, pk in changes if action == 'insert')
+    question_pool.discard(pk for action, pk in changes if action == 'delete')
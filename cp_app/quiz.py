@@ -1,12 +1,70 @@
-from random import sample
-
 from flask import (
-     Blueprint, redirect, render_template, request, url_for, session
+     Blueprint, abort, redirect, render_template, request, url_for, session
 )
+from sqlalchemy.orm import selectinload
 
+from cp_app import app, cache, render_cache
 from cp_app.models import Question
+from cp_app.question_pool import question_pool
+from cp_app.quiz_store import QuizProgress, new_quiz_id, quiz_store
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/quiz')
+QUIZ_SIZE = 10
+
+
+def _snapshot_size(quiz_id, snapshot):
+    return len(quiz_id) + sum(
+        len(q['title']) + len(q['title_html']) + len(q['text_html'])
+        for q in snapshot.values()
+    )
+
+
+# Готовые к выводу вопросы квиза: quiz_id -> {question_id: payload}
+quiz_snapshots = cache.register('quiz_snapshots', cache.LRUCache(
+    app.config['QUIZ_SNAPSHOT_BYTES'], sizeof=_snapshot_size
+))
+
+
+def _build_snapshot(question_ids):
+    """Загружает вопросы квиза одним запросом вместе с тегами."""
+    questions = Question.query.options(selectinload(Question.tags)).filter(
+        Question.id.in_(question_ids)
+    )
+    return {
+        q.id: dict(
+            id=q.id,
+            title=q.title,
+            title_html=q.title_html or render_cache.render(q.title),
+            text_html=q.text_html or render_cache.render(q.text),
+            tags=[tag.name for tag in q.tags],
+        )
+        for q in questions
+    }
+
+
+def _snapshot(quiz_id, progress):
+    snapshot = quiz_snapshots.get(quiz_id)
+    if snapshot is None:
+        # квиз начат в другом воркере или снимок вытеснен из кеша
+        snapshot = _build_snapshot(progress.question_ids)
+        quiz_snapshots.set(quiz_id, snapshot)
+    return snapshot
+
+
+def _load_progress():
+    """Прогресс текущего квиза; в cookie лежит только его id."""
+    quiz_id = session.get('quiz_id')
+    if quiz_id is None:
+        return None, None
+    return quiz_id, quiz_store().load(quiz_id)
+
+
+def _question_id(progress, n):
+    if progress is None:
+        return None
+    if not 0 <= n < progress.total:
+        abort(404)
+    return progress.question_ids[n]
 
 
 @quiz_bp.route('/start', methods=['GET'])
@@ -17,49 +75,62 @@ def quiz_start():
 
 @quiz_bp.route('/begin', methods=['POST'])
 def quiz_begin():
-    """Создаёт список из 10 id-вопросов и кладёт его в session."""
-    all_ids = [q.id for q in Question.query.all()]
-    if len(all_ids) < 10:
-        session['quiz_ids'] = sample(all_ids, k=len(all_ids))
-        session['quiz_total'] = len(all_ids)
-    else:
-        session['quiz_ids'] = sample(all_ids, k=10)
-        session['quiz_total'] = 10
-
-    session['quiz_index'] = 0
-    session['quiz_correct'] = 0
-    # Добавляем словарь для хранения ответов
-    session['quiz_answers'] = {}
+    """Создаёт квиз из 10 id-вопросов в серверном хранилище."""
+    # id берутся из закешированного пула, а сами вопросы вместе с тегами
+    # загружаются один раз, сразу для всех шагов квиза
+    progress = QuizProgress(question_pool.sample(QUIZ_SIZE))
+    old_quiz_id = session.get('quiz_id')
+    if old_quiz_id is not None:
+        quiz_store().delete(old_quiz_id)
+        quiz_snapshots.delete(old_quiz_id)
+    quiz_id = new_quiz_id()
+    quiz_store().save(quiz_id, progress)
+    quiz_snapshots.set(quiz_id, _build_snapshot(progress.question_ids))
+    session['quiz_id'] = quiz_id
     return redirect(url_for('quiz.quiz_step', n=0))
 
 
+def _step_question(quiz_id, progress, n):
+    q_id = _question_id(progress, n)
+    if q_id is None:
+        return None
+    question = _snapshot(quiz_id, progress).get(q_id)
+    if question is None:
+        abort(404)
+    return question
+
+
 @quiz_bp.route('/step/<int:n>')
 def quiz_step(n):
-    # пока убираем строгую проверку
-    q_id = session['quiz_ids'][n]  # если n вне диапазона → IndexError, это ОК
-    question = Question.query.get_or_404(q_id)
-    return render_template('quiz_step.html', question=question, n=n)
+    quiz_id, progress = _load_progress()
+    question = _step_question(quiz_id, progress, n)
+    if question is None:
+        return redirect(url_for('quiz.quiz_start'))
+    return render_template(
+        'quiz_step.html', question=question, n=n, total=progress.total
+    )
 
 
 @quiz_bp.route('/reveal/<int:n>', methods=['POST'])
 def quiz_reveal(n):
-    q_id = session['quiz_ids'][n]
-    question = Question.query.get_or_404(q_id)
+    quiz_id, progress = _load_progress()
+    question = _step_question(quiz_id, progress, n)
+    if question is None:
+        return redirect(url_for('quiz.quiz_start'))
     return render_template('quiz_reveal.html', question=question, n=n)
 
 
 @quiz_bp.route('/mark/<int:n>', methods=['POST'])
 def quiz_mark(n):
-    q_id = session['quiz_ids'][n]
-    if request.form.get('mark') == 'answered':
-        session['quiz_correct'] = session.get('quiz_correct', 0) + 1
-        # Сохраняем результат ответа для конкретного вопроса
-        answers = session.get('quiz_answers', {})
-        answers[str(q_id)] = True
-        session['quiz_answers'] = answers
+    quiz_id, progress = _load_progress()
+    if _question_id(progress, n) is None:
+        return redirect(url_for('quiz.quiz_start'))
+    progress.mark(n, request.form.get('mark') == 'answered')
+    progress.index = n + 1
+    quiz_store().save(quiz_id, progress)
 
     next_n = n + 1
-    if next_n >= session['quiz_total']:
+    if next_n >= progress.total:
         return redirect(url_for('quiz.finish'))
 
     return redirect(url_for('quiz.quiz_step', n=next_n))
@@ -67,20 +138,22 @@ def quiz_mark(n):
 
 @quiz_bp.route('/finish')
 def finish():
-    correct = session.get('quiz_correct', 0)
-    total = session.get('quiz_total', 10)
-    quiz_ids = session.get('quiz_ids', [])
-    questions = Question.query.filter(Question.id.in_(quiz_ids)).all()
-    questions = sorted(questions, key=lambda q: quiz_ids.index(q.id))
-
-    # Получаем ответы для каждого вопроса
-    answers_dict = session.get('quiz_answers', {})
-    answers = [answers_dict.get(str(q.id), False) for q in questions]
+    quiz_id, progress = _load_progress()
+    if progress is None:
+        return redirect(url_for('quiz.quiz_start'))
+    snapshot = _snapshot(quiz_id, progress)
+
+    # Порядок квиза восстанавливается за один проход по его id
+    questions, answers = [], []
+    for n, q_id in enumerate(progress.question_ids):
+        if q_id in snapshot:
+            questions.append(snapshot[q_id])
+            answers.append(progress.is_answered(n))
 
     return render_template(
         'quiz_finish.html',
-        correct=correct,
-        total=total,
+        correct=progress.correct,
+        total=progress.total,
         questions=questions,
         answers=answers
     )
@@ -88,9 +161,8 @@ def finish():
 
 @quiz_bp.route('/reset', methods=['POST'])
 def reset():
-    session.pop('quiz_ids', None)
-    session.pop('quiz_index', None)
-    session.pop('quiz_correct', None)
-    session.pop('quiz_total', None)
-    session.pop('quiz_answers', None)
+    quiz_id = session.pop('quiz_id', None)
+    if quiz_id is not None:
+        quiz_store().delete(quiz_id)
+        quiz_snapshots.delete(quiz_id)
     return redirect(url_for('quiz.quiz_start'))
@@ -0,0 +1,169 @@
+import secrets
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+
+from . import app, db
+from .models import QuizSession
+
+_HEADER = struct.Struct('<HH')
+
+
+class QuizProgress:
+    """Прогресс квиза: id вопросов, текущий шаг и битовая карта ответов.
+
+    Бит n в answered означает, что на n-й вопрос пользователь ответил.
+    """
+
+    __slots__ = ('question_ids', 'answered', 'index')
+
+    def __init__(self, question_ids, answered=0, index=0):
+        self.question_ids = list(question_ids)
+        self.answered = answered
+        self.index = index
+
+    @property
+    def total(self):
+        return len(self.question_ids)
+
+    @property
+    def correct(self):
+        return bin(self.answered).count('1')
+
+    def is_answered(self, n):
+        return bool(self.answered >> n & 1)
+
+    def mark(self, n, answered):
+        if answered:
+            self.answered |= 1 << n
+        else:
+            self.answered &= ~(1 << n)
+
+    def encode(self) -> bytes:
+        """Заголовок (количество, шаг), id по 4 байта и битовая карта."""
+        total = self.total
+        return (
+            _HEADER.pack(total, self.index)
+            + struct.pack(f'<{total}i', *self.question_ids)
+            + self.answered.to_bytes((total + 7) // 8, 'little')
+        )
+
+    @classmethod
+    def decode(cls, data: bytes):
+        total, index = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        question_ids = struct.unpack_from(f'<{total}i', data, offset)
+        offset += 4 * total
+        answered = int.from_bytes(data[offset:], 'little')
+        return cls(question_ids, answered=answered, index=index)
+
+
+def new_quiz_id():
+    return secrets.token_urlsafe(16)
+
+
+class MemoryQuizStore:
+    """Хранилище в памяти процесса — для тестов и локального запуска."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, quiz_id):
+        with self._lock:
+            item = self._data.get(quiz_id)
+            if item is None:
+                return None
+            data, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[quiz_id]
+                return None
+        return QuizProgress.decode(data)
+
+    def save(self, quiz_id, progress):
+        with self._lock:
+            self._data[quiz_id] = (
+                progress.encode(), time.monotonic() + self.ttl
+            )
+
+    def delete(self, quiz_id):
+        with self._lock:
+            self._data.pop(quiz_id, None)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items()
+                       if expires_at < now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class SQLQuizStore:
+    """Хранилище в таблице quiz_session (SQLite/PostgreSQL).
+
+    Брошенные квизы удаляются по expires_at: не чаще раза в purge_interval
+    при создании нового квиза и командой `flask purge_quizzes`.
+    """
+
+    def __init__(self, ttl, purge_interval=600):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._purged_at = 0
+
+    def _expires_at(self):
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    def load(self, quiz_id):
+        row = db.session.get(QuizSession, quiz_id)
+        if row is None or row.expires_at < datetime.utcnow():
+            return None
+        return QuizProgress.decode(row.data)
+
+    def save(self, quiz_id, progress):
+        data, expires_at = progress.encode(), self._expires_at()
+        row = db.session.get(QuizSession, quiz_id)
+        if row is None:
+            if time.monotonic() - self._purged_at > self.purge_interval:
+                self.purge_expired(commit=False)
+            db.session.add(
+                QuizSession(id=quiz_id, data=data, expires_at=expires_at)
+            )
+        else:
+            row.data = data
+            row.expires_at = expires_at
+        db.session.commit()
+
+    def delete(self, quiz_id):
+        db.session.execute(
+            db.delete(QuizSession).where(QuizSession.id == quiz_id)
+        )
+        db.session.commit()
+
+    def purge_expired(self, commit=True):
+        self._purged_at = time.monotonic()
+        result = db.session.execute(
+            db.delete(QuizSession)
+            .where(QuizSession.expires_at < datetime.utcnow())
+        )
+        if commit:
+            db.session.commit()
+        return result.rowcount
+
+
+QUIZ_STORES = {
+    'memory': MemoryQuizStore,
+    'sql': SQLQuizStore,
+}
+_stores = {}
+
+
+def quiz_store():
+    """Хранилище, выбранное настройкой QUIZ_STORE."""
+    backend = app.config['QUIZ_STORE']
+    if backend not in _stores:
+        _stores[backend] = QUIZ_STORES[backend](ttl=app.config['QUIZ_TTL'])
+    return _stores[backend]
@@ -0,0 +1,182 @@
+import hashlib
+import html
+import re
+import sqlite3
+import threading
+import time
+
+import bleach
+import markdown
+from bleach.sanitizer import Cleaner
+
+from .cache import LRUCache
+
+ALLOWED_TAGS = [
+    'p', 'br', 'strong', 'em', 'ul', 'ol', 'li',
+    'pre', 'code', 'blockquote', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'a'
+]
+MARKDOWN_EXTENSIONS = ['codehilite', 'fenced_code', 'tables']
+
+
+class MarkdownRenderer:
+    """Markdown -> безопасный HTML без повторной настройки на каждый вызов.
+
+    Ни markdown.Markdown, ни bleach.Cleaner не потокобезопасны, поэтому
+    каждый поток (и каждый воркер gunicorn) держит свою пару объектов,
+    а между документами Markdown только сбрасывается через reset().
+    """
+
+    def __init__(self, extensions=None, tags=None):
+        self.extensions = list(extensions or MARKDOWN_EXTENSIONS)
+        self.tags = list(tags or ALLOWED_TAGS)
+        self._local = threading.local()
+        # Меняется вместе с настройками и библиотеками: старые записи кеша
+        # просто перестают находиться
+        self.version = hashlib.sha1(repr((
+            markdown.__version__, bleach.__version__,
+            self.extensions, self.tags,
+        )).encode()).hexdigest()[:12]
+
+    def _pipeline(self):
+        local = self._local
+        if not hasattr(local, 'md'):
+            local.md = markdown.Markdown(extensions=self.extensions)
+            local.cleaner = Cleaner(tags=self.tags, strip=True)
+        return local.md, local.cleaner
+
+    def render(self, text: str) -> str:
+        md, cleaner = self._pipeline()
+        try:
+            html = md.convert(text)
+        finally:
+            md.reset()
+        return cleaner.clean(html)
+
+
+renderer = MarkdownRenderer()
+
+
+def md_to_html(text: str) -> str:
+    return renderer.render(text)
+
+
+_HTML_TAG_RE = re.compile(r'<[^>]*>')
+
+
+def html_to_text(value: str) -> str:
+    """Текст без разметки: для полнотекстового индекса и сниппетов."""
+    text = html.unescape(_HTML_TAG_RE.sub(' ', value or ''))
+    return ' '.join(text.split())
+
+
+class SharedRenderStore:
+    """Общий для всех воркеров gunicorn уровень кеша в SQLite-файле."""
+
+    def __init__(self, path, max_rows=20000):
+        self.path = path
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        conn = sqlite3.connect(path, timeout=1)
+        try:
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS render_cache ('
+                    'key TEXT PRIMARY KEY, html TEXT NOT NULL, '
+                    'created REAL NOT NULL)'
+                )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connect().execute(
+                'SELECT html FROM render_cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, html):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO render_cache (key, html, created) '
+                    'VALUES (?, ?, ?)', (key, html, time.time())
+                )
+                self._writes += 1
+                if self._writes % 500 == 0:
+                    conn.execute(
+                        'DELETE FROM render_cache WHERE key IN ('
+                        'SELECT key FROM render_cache ORDER BY created DESC '
+                        'LIMIT -1 OFFSET ?)', (self.max_rows,)
+                    )
+        except sqlite3.Error:
+            # Общий кеш — оптимизация, его сбои не должны ронять страницу
+            self.errors += 1
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM render_cache')
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, errors=self.errors)
+
+
+class RenderCache:
+    """Кеш отрендеренного HTML по хешу исходника и версии рендерера.
+
+    Первый уровень — LRU в памяти процесса с вытеснением по байтам,
+    второй (необязательный) — SharedRenderStore, общий для воркеров.
+    """
+
+    def __init__(self, renderer, max_bytes, shared=None):
+        self.renderer = renderer
+        self.memory = LRUCache(max_bytes)
+        self.shared = shared
+
+    def key(self, text):
+        return hashlib.sha256(
+            f'{self.renderer.version}\0{text}'.encode()
+        ).hexdigest()
+
+    def render(self, text: str) -> str:
+        key = self.key(text)
+        html = self.memory.get(key)
+        if html is not None:
+            return html
+        if self.shared is not None:
+            html = self.shared.get(key)
+        if html is None:
+            html = self.renderer.render(text)
+            if self.shared is not None:
+                self.shared.set(key, html)
+        self.memory.set(key, html)
+        return html
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
@@ -0,0 +1,257 @@
+import re
+
+from flask_sqlalchemy.pagination import Pagination
+from markupsafe import Markup, escape
+from sqlalchemy import (
+    DDL, column, event, func, literal_column, or_, select, table
+)
+
+from . import db
+from .models import Question
+from .pagination import cached_count
+from .tags import tag_filter
+
+# Границы совпадения в сниппете: управляющие символы не встречаются в
+# тексте вопросов, поэтому сниппет можно сначала экранировать целиком,
+# а потом заменить их на <mark>
+_START, _STOP = '\x02', '\x03'
+_WORD_RE = re.compile(r'\w+')
+_fts = table('question_fts', column('rowid'))
+
+# Индексируется ответ без разметки (Question.text_plain), а не сырой
+# text: иначе теги вроде <p> и <strong> находились бы как слова, а в
+# сниппеты попадала бы экранированная разметка.
+# PostgreSQL: вычисляемый tsvector (заголовок весомее текста) и GIN-индекс
+PG_DDL = [
+    "ALTER TABLE question ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text_plain, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX ix_question_search_vector ON question "
+    "USING GIN (search_vector)",
+]
+
+# SQLite: FTS5-индекс с внешним содержимым, синхронизируется триггерами,
+# поэтому видит и Core-записи (пакетный импорт, render_questions).
+# Внимание: batch_alter_table('question') в миграциях на SQLite пересоздаёт
+# таблицу и молча теряет триггеры question_fts_*; такая миграция должна
+# создать их заново из этого списка и выполнить 'rebuild' индекса
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE question_fts USING fts5("
+    "title, text_plain, content='question', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER question_fts_ai AFTER INSERT ON question BEGIN "
+    "INSERT INTO question_fts(rowid, title, text_plain) "
+    "VALUES (new.id, new.title, new.text_plain); END",
+    "CREATE TRIGGER question_fts_ad AFTER DELETE ON question BEGIN "
+    "INSERT INTO question_fts(question_fts, rowid, title, text_plain) "
+    "VALUES ('delete', old.id, old.title, old.text_plain); END",
+    "CREATE TRIGGER question_fts_au AFTER UPDATE OF title, text_plain "
+    "ON question BEGIN "
+    "INSERT INTO question_fts(question_fts, rowid, title, text_plain) "
+    "VALUES ('delete', old.id, old.title, old.text_plain); "
+    "INSERT INTO question_fts(rowid, title, text_plain) "
+    "VALUES (new.id, new.title, new.text_plain); END",
+]
+
+
+def include_schema_name(name, type_, parent_names):
+    """Фильтр include_name для Alembic: объекты поиска создаются DDL выше.
+
+    Их нет в db.metadata, и без фильтра autogenerate предложит их удалить.
+    """
+    if type_ == 'table':
+        return not name.startswith('question_fts')
+    if type_ == 'column':
+        return not (parent_names.get('table_name') == 'question' and
+                    name == 'search_vector')
+    if type_ == 'index':
+        return name != 'ix_question_search_vector'
+    return True
+
+
+for _statement in PG_DDL:
+    event.listen(Question.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='postgresql'))
+for _statement in SQLITE_DDL:
+    event.listen(Question.__table__, 'after_create',
+                 DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Question.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS question_fts')
+             .execute_if(dialect='sqlite'))
+
+
+def highlight(snippet):
+    """Экранирует сниппет и подсвечивает совпадения тегом <mark>."""
+    if not snippet:
+        return Markup('')
+    return Markup(
+        str(escape(snippet))
+        .replace(_START, '<mark>')
+        .replace(_STOP, '</mark>')
+    )
+
+
+class PostgresSearch:
+    """websearch_to_tsquery по search_vector, ранжирование ts_rank_cd."""
+
+    def _query(self, term):
+        return func.websearch_to_tsquery('russian', term)
+
+    def _where(self, term, criterion):
+        vector = literal_column('question.search_vector')
+        criteria = [vector.op('@@')(self._query(term))]
+        if criterion is not None:
+            criteria.append(criterion)
+        return criteria
+
+    def items(self, term, criterion, offset, limit):
+        vector = literal_column('question.search_vector')
+        query = self._query(term)
+        headline = func.ts_headline(
+            'russian', Question.text_plain, query,
+            f'StartSel={_START}, StopSel={_STOP}, '
+            'MaxWords=30, MinWords=10, MaxFragments=2',
+        )
+        return db.session.execute(
+            select(Question.id, Question.title, headline.label('snippet'))
+            .where(*self._where(term, criterion))
+            .order_by(func.ts_rank_cd(vector, query).desc(), Question.id)
+            .offset(offset).limit(limit)
+        ).all()
+
+    def count(self, term, criterion):
+        return db.session.scalar(
+            select(func.count(Question.id))
+            .where(*self._where(term, criterion))
+        )
+
+
+class SQLiteSearch:
+    """FTS5 MATCH с префиксным поиском по словам и ранжированием bm25."""
+
+    def _match(self, term):
+        # Каждое слово — отдельная фраза с префиксом: синтаксис FTS5 из
+        # пользовательского ввода не интерпретируется
+        words = _WORD_RE.findall(term)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def _select(self, columns, match, criterion):
+        query = (
+            select(*columns)
+            .select_from(_fts)
+            .join(Question, Question.id == _fts.c.rowid)
+            .where(literal_column('question_fts').op('MATCH')(match))
+        )
+        if criterion is not None:
+            query = query.where(criterion)
+        return query
+
+    def items(self, term, criterion, offset, limit):
+        match = self._match(term)
+        if not match:
+            return []
+        snippet = literal_column(
+            f"snippet(question_fts, 1, '{_START}', '{_STOP}', '…', 24)"
+        )
+        # bm25: меньше — релевантнее; совпадение в заголовке весит больше
+        rank = literal_column('bm25(question_fts, 10.0, 1.0)')
+        return db.session.execute(
+            self._select(
+                [Question.id, Question.title, snippet.label('snippet')],
+                match, criterion,
+            )
+            .order_by(rank, Question.id)
+            .offset(offset).limit(limit)
+        ).all()
+
+    def count(self, term, criterion):
+        match = self._match(term)
+        if not match:
+            return 0
+        return db.session.scalar(
+            self._select([func.count()], match, criterion)
+        )
+
+
+class LikeSearch:
+    """Запасной вариант для прочих СУБД: ILIKE без ранжирования."""
+
+    def _where(self, term, criterion):
+        criteria = [or_(Question.title.ilike(f'%{term}%'),
+                        Question.text_plain.ilike(f'%{term}%'))]
+        if criterion is not None:
+            criteria.append(criterion)
+        return criteria
+
+    def items(self, term, criterion, offset, limit):
+        return db.session.execute(
+            select(Question.id, Question.title,
+                   literal_column("''").label('snippet'))
+            .where(*self._where(term, criterion))
+            .order_by(Question.id)
+            .offset(offset).limit(limit)
+        ).all()
+
+    def count(self, term, criterion):
+        return db.session.scalar(
+            select(func.count(Question.id))
+            .where(*self._where(term, criterion))
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+def search_backend():
+    dialect = db.session.get_bind().dialect.name
+    return BACKENDS.get(dialect, LikeSearch)()
+
+
+class SearchResult:
+    """Найденный вопрос: id, заголовок и подсвеченный сниппет ответа."""
+
+    __slots__ = ('id', 'title', 'snippet')
+
+    def __init__(self, id, title, snippet):
+        self.id = id
+        self.title = title
+        self.snippet = highlight(snippet)
+
+
+class SearchPagination(Pagination):
+    """Страница результатов поиска с тем же интерфейсом, что у paginate()."""
+
+    def _query_items(self):
+        args = self._query_args
+        rows = args['backend'].items(
+            args['term'], args['criterion'], self._query_offset, self.per_page
+        )
+        return [SearchResult(*row) for row in rows]
+
+    def _query_count(self):
+        args = self._query_args
+        return cached_count(
+            ('search', args['term'], args['tags'], args['mode']),
+            lambda: args['backend'].count(args['term'], args['criterion']),
+        )
+
+    def link_args(self, page):
+        return {'page': page}
+
+
+def search_questions(term, tags=(), mode='all', page=None, per_page=20):
+    """Ранжированный полнотекстовый поиск по заголовкам и ответам.
+
+    tags и mode — фильтр по тегам, как у tag_filter().
+    """
+    tags = tuple(sorted(tags))
+    return SearchPagination(
+        page=page, per_page=per_page,
+        backend=search_backend(), term=term, tags=tags, mode=mode,
+        criterion=tag_filter(tags, mode) if tags else None,
+    )
@@ -0,0 +1,78 @@
+// suggest.js - подсказки из /api/suggest для полей с атрибутом data-suggest
+// data-suggest="questions" - заголовки вопросов и теги (поиск),
+// data-suggest="tags" - теги для последнего элемента списка через запятую
+class SuggestField {
+    constructor(input) {
+        this.input = input;
+        this.mode = input.dataset.suggest;
+        this.timer = null;
+        this.controller = null;
+        this.list = document.createElement('datalist');
+        this.list.id = `${input.id || input.name}-suggest`;
+        input.setAttribute('list', this.list.id);
+        input.setAttribute('autocomplete', 'off');
+        input.after(this.list);
+        input.addEventListener('input', () => this.schedule());
+    }
+
+    // В поле тегов подсказываем только последний тег после запятой
+    splitValue() {
+        const value = this.input.value;
+        if (this.mode !== 'tags') {
+            return ['', value];
+        }
+        const pos = value.lastIndexOf(',') + 1;
+        const head = value.slice(0, pos);
+        return [head ? `${head.trimEnd()} ` : '', value.slice(pos).trim()];
+    }
+
+    schedule() {
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.load(), 150);
+    }
+
+    async load() {
+        const [head, query] = this.splitValue();
+        if (!query) {
+            this.list.replaceChildren();
+            return;
+        }
+        // Устаревший запрос отменяем, чтобы не перетёр свежие подсказки
+        if (this.controller) {
+            this.controller.abort();
+        }
+        this.controller = new AbortController();
+        const params = new URLSearchParams({ q: query });
+        try {
+            const response = await fetch(`/api/suggest?${params}`, {
+                signal: this.controller.signal,
+            });
+            if (!response.ok) {
+                return;
+            }
+            const data = await response.json();
+            const values = this.mode === 'tags'
+                ? data.tags.map((name) => head + name)
+                : [...data.questions.map((q) => q.title), ...data.tags];
+            this.render(values);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                this.list.replaceChildren();
+            }
+        }
+    }
+
+    render(values) {
+        this.list.replaceChildren(...values.map((value) => {
+            const option = document.createElement('option');
+            option.value = value;
+            return option;
+        }));
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('[data-suggest]').forEach(
+        (input) => new SuggestField(input)
+    );
+});
@@ -0,0 +1,211 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import select
+
+from . import app, cache, db
+from .models import Question, Tag
+
+_SPACES_RE = re.compile(r'\s+')
+_WORD_START_RE = re.compile(r'(?<!\w)\w')
+
+
+def normalize(text):
+    return _SPACES_RE.sub(' ', text).strip().lower()
+
+
+class SuggestIndex:
+    """Префиксный индекс заголовков вопросов и имён тегов.
+
+    Записи (ключ, id) лежат в отсортированных списках, поиск — bisect по
+    префиксу. Для заголовка ключи — его хвосты с начала каждого слова,
+    обрезанные до key_length символов, поэтому «генер» находит и
+    «Как работают генераторы?». Свои записи индекс узнаёт из событий
+    SQLAlchemy, чужие — при полной перестройке раз в reload_interval.
+    Изменённые id лишь помечаются после коммита (в after_commit нельзя
+    выполнять SQL) и дочитываются одним запросом при следующем поиске.
+    """
+
+    def __init__(self, reload_interval, key_length=32, max_scan=500):
+        self.reload_interval = reload_interval
+        self.key_length = key_length
+        self.max_scan = max_scan
+        self._titles = {}
+        self._tags = {}
+        self._title_keys = []
+        self._tag_keys = []
+        self._loaded_at = None
+        self._pending_questions = set()
+        self._pending_tags = set()
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.lookups = 0
+
+    def _keys(self, title):
+        title = normalize(title)
+        return {
+            title[match.start():match.start() + self.key_length]
+            for match in _WORD_START_RE.finditer(title)
+        }
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or \
+                time.monotonic() - self._loaded_at > self.reload_interval:
+            self.reload()
+            return
+        if self._pending_questions:
+            with self._lock:
+                ids, self._pending_questions = self._pending_questions, set()
+            rows = db.session.execute(
+                select(Question.id, Question.title)
+                .where(Question.id.in_(ids))
+            ).all()
+            self.update_questions(
+                rows, deleted=ids.difference(row.id for row in rows)
+            )
+        if self._pending_tags:
+            with self._lock:
+                ids, self._pending_tags = self._pending_tags, set()
+            rows = db.session.execute(
+                select(Tag.id, Tag.name).where(Tag.id.in_(ids))
+            ).all()
+            self.update_tags(
+                rows, deleted=ids.difference(row.id for row in rows)
+            )
+
+    def mark_changed(self, question_ids=(), tag_ids=()):
+        with self._lock:
+            if self._loaded_at is not None:
+                self._pending_questions.update(question_ids)
+                self._pending_tags.update(tag_ids)
+
+    def reload(self):
+        titles = dict(db.session.execute(
+            select(Question.id, Question.title)
+        ).all())
+        tags = dict(db.session.execute(select(Tag.id, Tag.name)).all())
+        title_keys = sorted(
+            (key, question_id)
+            for question_id, title in titles.items()
+            for key in self._keys(title)
+        )
+        tag_keys = sorted((normalize(name), tag_id)
+                          for tag_id, name in tags.items())
+        with self._lock:
+            self._titles, self._tags = titles, tags
+            self._title_keys, self._tag_keys = title_keys, tag_keys
+            self._pending_questions, self._pending_tags = set(), set()
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+
+    def _remove(self, keys, values, item_id, text, make_keys):
+        for key in make_keys(text):
+            pos = bisect_left(keys, (key, item_id))
+            if pos < len(keys) and keys[pos] == (key, item_id):
+                del keys[pos]
+        values.pop(item_id, None)
+
+    def update_questions(self, rows, deleted=()):
+        """rows — пары (id, title) новых и изменённых вопросов."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for question_id, title in rows:
+                if question_id in self._titles:
+                    self._remove(self._title_keys, self._titles, question_id,
+                                 self._titles[question_id], self._keys)
+                self._titles[question_id] = title
+                for key in self._keys(title):
+                    insort(self._title_keys, (key, question_id))
+            for question_id in deleted:
+                if question_id in self._titles:
+                    self._remove(self._title_keys, self._titles, question_id,
+                                 self._titles[question_id], self._keys)
+
+    def update_tags(self, rows, deleted=()):
+        """rows — пары (id, name) новых и переименованных тегов."""
+        def tag_keys(name):
+            return {normalize(name)}
+
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for tag_id, name in rows:
+                if tag_id in self._tags:
+                    self._remove(self._tag_keys, self._tags, tag_id,
+                                 self._tags[tag_id], tag_keys)
+                self._tags[tag_id] = name
+                insort(self._tag_keys, (normalize(name), tag_id))
+            for tag_id in deleted:
+                if tag_id in self._tags:
+                    self._remove(self._tag_keys, self._tags, tag_id,
+                                 self._tags[tag_id], tag_keys)
+
+    def _scan(self, keys, prefix, limit, accept):
+        found = {}
+        start = bisect_left(keys, (prefix[:self.key_length],))
+        stop = min(len(keys), start + self.max_scan)
+        for pos in range(start, stop):
+            key, item_id = keys[pos]
+            if not key.startswith(prefix[:self.key_length]):
+                break
+            if item_id not in found and accept(item_id):
+                found[item_id] = None
+                if len(found) == limit:
+                    break
+        return list(found)
+
+    def suggest(self, query, limit):
+        """До limit вопросов и тегов, начинающихся (по словам) с query."""
+        prefix = normalize(query)
+        if not prefix:
+            return [], []
+        self._ensure_fresh()
+        with self._lock:
+            self.lookups += 1
+            # Ключи обрезаны до key_length, длинный запрос сверяем с заголовком
+            question_ids = self._scan(
+                self._title_keys, prefix, limit,
+                lambda question_id: len(prefix) <= self.key_length or
+                prefix in normalize(self._titles[question_id]),
+            )
+            tag_ids = self._scan(self._tag_keys, prefix, limit,
+                                 lambda tag_id: True)
+            return (
+                [dict(id=question_id, title=self._titles[question_id])
+                 for question_id in question_ids],
+                [self._tags[tag_id] for tag_id in tag_ids],
+            )
+
+    def clear(self):
+        with self._lock:
+            self._titles, self._tags = {}, {}
+            self._title_keys, self._tag_keys = [], []
+            self._pending_questions, self._pending_tags = set(), set()
+            self._loaded_at = None
+
+    def stats(self):
+        return dict(
+            questions=len(self._titles),
+            title_keys=len(self._title_keys),
+            tags=len(self._tags),
+            reloads=self.reloads,
+            lookups=self.lookups,
+        )
+
+
+suggest_index = cache.register('suggest', SuggestIndex(
+    reload_interval=app.config['SUGGEST_RELOAD'],
+))
+
+
+@cache.on_commit(Question, 'insert', 'update', 'delete')
+def _sync_suggest_questions(changes):
+    suggest_index.mark_changed(question_ids=[pk for action, pk in changes])
+
+
+@cache.on_commit(Tag, 'insert', 'update', 'delete')
+def _sync_suggest_tags(changes):
+    suggest_index.mark_changed(tag_ids=[pk for action, pk in changes])
@@ -0,0 +1,129 @@
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, select
+
+from . import cache, db
+from .models import Question, Tag, question_tags, upsert_insert
+
+TAG_MODES = ('all', 'any')
+
+
+def clean_tag_names(names):
+    """Имена тегов в нижнем регистре без пустых и повторов, порядок сохраняется."""
+    cleaned = dict.fromkeys(name.strip().lower() for name in names)
+    return [name for name in cleaned if name]
+
+
+def resolve_tag_ids(names):
+    """{имя: id} для всех names; недостающие теги создаются.
+
+    Существующие теги ищутся одним IN-запросом, новые вставляются одной
+    пачкой с ON CONFLICT DO NOTHING: тег, одновременно созданный другой
+    транзакцией, не приводит к IntegrityError.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    found = dict(db.session.execute(
+        select(Tag.name, Tag.id).where(Tag.name.in_(names))
+    ).all())
+    missing = names.difference(found)
+    if missing:
+        db.session.execute(
+            upsert_insert(Tag.__table__).on_conflict_do_nothing(
+                index_elements=['name']
+            ),
+            [{'name': name} for name in sorted(missing)]
+        )
+        created = db.session.execute(
+            select(Tag.name, Tag.id).where(Tag.name.in_(missing))
+        ).all()
+        for name, tag_id in created:
+            # Core-вставка не порождает событий маппера
+            cache.record_change(db.session, Tag, 'insert', tag_id)
+        found.update(created)
+    return found
+
+
+def question_tag_links(question_ids):
+    """Текущие теги вопросов: {question_id: {имя: tag_id}}."""
+    links = defaultdict(dict)
+    if question_ids:
+        for question_id, name, tag_id in db.session.execute(
+            select(question_tags.c.question_id, Tag.name, Tag.id)
+            .join(Tag, Tag.id == question_tags.c.tag_id)
+            .where(question_tags.c.question_id.in_(question_ids))
+        ):
+            links[question_id][name] = tag_id
+    return links
+
+
+def sync_tag_links(wanted, current):
+    """Приводит связи к wanted = {question_id: {tag_id}}.
+
+    current — текущие связи тех же вопросов в том же виде; вставляются
+    и удаляются только отличающиеся строки question_tags.
+    """
+    added, removed = [], []
+    for question_id, tag_ids in wanted.items():
+        old_ids = current.get(question_id, set())
+        added.extend(
+            {'question_id': question_id, 'tag_id': tag_id}
+            for tag_id in tag_ids - old_ids
+        )
+        removed.extend(
+            {'q_id': question_id, 't_id': tag_id}
+            for tag_id in old_ids - tag_ids
+        )
+    if not added and not removed:
+        return
+    if removed:
+        db.session.execute(
+            question_tags.delete().where(
+                question_tags.c.question_id == bindparam('q_id'),
+                question_tags.c.tag_id == bindparam('t_id'),
+            ),
+            removed
+        )
+    if added:
+        db.session.execute(question_tags.insert(), added)
+    # Core-запросы мимо ORM: счётчики тегов пересчитываем сами
+    tag_ids = {row['tag_id'] for row in added} | \
+        {row['t_id'] for row in removed}
+    Tag.recount(db.session.connection(), tag_ids)
+    for tag_id in tag_ids:
+        cache.record_change(db.session, Tag, 'update', tag_id)
+
+
+def set_question_tags(question, names):
+    """Приводит question.tags к names для ORM-объекта вопроса.
+
+    Имена разрешаются через resolve_tag_ids, а коллекция меняется по
+    разнице: неизменившиеся связи не удаляются и не вставляются заново.
+    """
+    tag_ids = set(resolve_tag_ids(clean_tag_names(names)).values())
+    current = {tag.id for tag in question.tags}
+    for tag in [tag for tag in question.tags if tag.id not in tag_ids]:
+        question.tags.remove(tag)
+    missing = tag_ids - current
+    if missing:
+        question.tags.extend(db.session.scalars(
+            select(Tag).where(Tag.id.in_(missing)).order_by(Tag.id)
+        ))
+
+
+def tag_filter(names, mode='all'):
+    """Условие на вопросы с тегами names: со всеми (all) или с любым (any).
+
+    Пересечение и объединение считаются в БД по индексу
+    question_tags(tag_id, question_id).
+    """
+    tag_ids = select(Tag.id).where(Tag.name.in_(names))
+    question_ids = select(question_tags.c.question_id).where(
+        question_tags.c.tag_id.in_(tag_ids)
+    )
+    if mode == 'all' and len(names) > 1:
+        question_ids = question_ids.group_by(
+            question_tags.c.question_id
+        ).having(func.count() == len(names))
+    return Question.id.in_(question_ids)
@@ -1,13 +1,18 @@
-from random import randrange
 from functools import wraps
 
 from flask import abort, flash, redirect, render_template, request, url_for
 from flask_login import login_user, logout_user, login_required, current_user
-from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from werkzeug.local import LocalProxy
 
-from . import app, db
+from . import app, cache, db
 from .forms import LoginForm, QuestionForm, RegistrationForm, CommentForm
 from .models import Question, User, Comment, Tag
+from .pagination import KeysetPagination
+from .question_pool import question_pool
+from .search import search_questions
+from .tags import TAG_MODES, clean_tag_names, set_question_tags, tag_filter
 from .quiz import *   # noqa
 
 
@@ -15,25 +20,7 @@ def _parse_tags(raw: str):
     """Разбирает строку тегов в список уникальных имён (в нижнем регистре)."""
     if not raw:
         return []
-    parts = [p.strip().lower() for p in raw.split(',')]
-    # удаляем пустые и дубликаты, сохраняя порядок
-    seen = set()
-    tags = []
-    for name in parts:
-        if name and name not in seen:
-            seen.add(name)
-            tags.append(name)
-    return tags
-
-
-def _sync_question_tags(question, tag_names):
-    """Обновляет теги вопроса, создавая недостающие теги."""
-    question.tags = []  # очищаем текущие связи
-    for name in tag_names:
-        tag = Tag.query.filter_by(name=name).first()
-        if not tag:
-            tag = Tag(name=name)
-        question.tags.append(tag)
+    return clean_tag_names(raw.split(','))
 
 
 def admin_required(f):
@@ -46,11 +33,7 @@ def admin_required(f):
 
 
 def random_question():
-    quantity = Question.query.count()
-    if quantity:
-        offset_value = randrange(quantity)
-        opinion = Question.query.offset(offset_value).first()
-        return opinion
+    return question_pool.random_question()
 
 
 @app.route('/')
@@ -72,7 +55,7 @@ def add_question_view():
             text=form.text.data,
         )
         tags = _parse_tags(form.tags.data)
-        _sync_question_tags(question, tags)
+        set_question_tags(question, tags)
         db.session.add(question)
         db.session.commit()
         return redirect(url_for('question_view', id=question.id))
@@ -120,7 +103,7 @@ def edit_question_view(id):
         question.title = form.title.data
         question.text = form.text.data
         tags = _parse_tags(form.tags.data)
-        _sync_question_tags(question, tags)
+        set_question_tags(question, tags)
         db.session.commit()
         flash('Вопрос обновлён')
         return redirect(url_for('question_view', id=question.id))
@@ -205,46 +188,132 @@ def all_questions():
     page = request.args.get('page', 1, type=int)
     per_page = 20
     search = request.args.get('search', '', type=str).strip()
-    tag_filter = request.args.get('tag', '', type=str).strip()
+    # теги хранятся в нижнем регистре (clean_tag_names), так и сравниваем
+    active_tags = clean_tag_names(request.args.getlist('tag'))
+    mode = request.args.get('mode', 'all')
+    if mode not in TAG_MODES:
+        mode = 'all'
 
-    query = Question.query
     if search:
-        search_filter = or_(
-            Question.title.ilike(f'%{search}%'),
-            Question.text.ilike(f'%{search}%')
+        # полнотекстовый индекс: tsvector на PostgreSQL, FTS5 на SQLite
+        pagination = search_questions(
+            search, tags=active_tags, mode=mode, page=page, per_page=per_page
         )
-        query = query.filter(search_filter)
-
-    if tag_filter:
-        query = query.join(Question.tags).filter(Tag.name == tag_filter)
-
-    pagination = query.order_by(
-        Question.id).paginate(page=page, per_page=per_page)
-    all_tags = Tag.query.order_by(Tag.name).all()
+    else:
+        # без поиска листаем по курсору id, а не по OFFSET
+        # в списке нужны только id и заголовок, ответы из БД не читаем
+        statement = select(Question).options(
+            load_only(Question.id, Question.title))
+        if active_tags:
+            statement = statement.where(tag_filter(active_tags, mode))
+        pagination = KeysetPagination(
+            statement, ('list', tuple(sorted(active_tags)), mode),
+            page=page, per_page=per_page,
+            after=request.args.get('after', type=int),
+            before=request.args.get('before', type=int),
+            skip=request.args.get('skip', 0, type=int),
+            last=request.args.get('last', 0, type=int) == 1,
+            estimate=not active_tags,
+        )
+        if not pagination.items and page > 1:
+            abort(404)
     return render_template(
         'questions_list.html',
         questions=pagination.items,
         pagination=pagination,
         search=search,
-        tags=all_tags,
-        active_tag=tag_filter
+        tags=tag_cloud.get(),
+        active_tags=active_tags,
+        mode=mode,
     )
 
 
-@app.context_processor
-def inject_news():
-    # последние 5 вопросов
-    latest_questions = Question.query.order_by(
-        Question.id.desc()
-    ).limit(5).all()
-    # последние 5 комментариев с JOIN пользователей и вопросов
-    latest_comments = (
-        db.session.query(Comment, User.username, Question.title, Question.id)
-        .join(User).join(Question)
+def _cut_open_tag(text):
+    # обрезка в БД может разрезать HTML-тег, striptags его не уберёт
+    start = text.rfind('<')
+    return text[:start] if start > text.rfind('>') else text
+
+
+def _load_latest_questions():
+    # последние 5 вопросов; строки, а не ORM-объекты — их можно держать в
+    # кеше между запросами без привязки к сессии. Из ответа нужно только
+    # начало для превью, его и читаем
+    rows = db.session.execute(
+        select(
+            Question.id,
+            Question.title,
+            Question.preview_expression(
+                app.config['NEWS_PREVIEW_LENGTH']).label('text'),
+        )
+        .order_by(Question.id.desc())
+        .limit(5)
+    ).all()
+    return [
+        dict(id=row.id, title=row.title, text=_cut_open_tag(row.text))
+        for row in rows
+    ]
+
+
+def _load_latest_comments():
+    # последние 3 комментария с JOIN пользователей и вопросов
+    return db.session.execute(
+        select(
+            Comment.text,
+            Comment.timestamp,
+            User.username.label('author'),
+            Question.title.label('question_title'),
+            Question.id.label('question_id'),
+        )
+        .join(User, Comment.user_id == User.id)
+        .join(Question, Comment.question_id == Question.id)
         .order_by(Comment.timestamp.desc())
         .limit(3)
-        .all()
-    )
+    ).all()
+
+
+def _load_tag_cloud():
+    # теги без вопросов в фильтре не показываем
+    return db.session.execute(
+        select(Tag.name, Tag.question_count)
+        .where(Tag.question_count > 0)
+        .order_by(Tag.name)
+    ).all()
+
+
+latest_questions = cache.register('latest_questions', cache.CachedValue(
+    _load_latest_questions, ttl=app.config['NEWS_TTL']
+))
+latest_comments = cache.register('latest_comments', cache.CachedValue(
+    _load_latest_comments, ttl=app.config['NEWS_TTL']
+))
+
+tag_cloud = cache.register('tag_cloud', cache.CachedValue(
+    _load_tag_cloud, ttl=app.config['TAG_CLOUD_TTL']
+))
+
+
+@cache.on_commit(Tag)
+def _invalidate_tag_cloud(changes):
+    # пересчёт question_count тоже записывается как изменение тега
+    tag_cloud.invalidate()
+
+
+@cache.on_commit(Question)
+def _invalidate_news(changes):
+    latest_questions.invalidate()
+    latest_comments.invalidate()
+
+
+@cache.on_commit(Comment)
+def _invalidate_latest_comments(changes):
+    latest_comments.invalidate()
+
+
+@app.context_processor
+def inject_news():
+    # LocalProxy откладывает запрос до первого обращения из шаблона:
+    # страницы без блока «Что нового» в БД не ходят
     return dict(
-        latest_questions=latest_questions, latest_comments=latest_comments
+        latest_questions=LocalProxy(latest_questions.get),
+        latest_comments=LocalProxy(latest_comments.get),
     )
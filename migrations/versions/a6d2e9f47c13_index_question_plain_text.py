@@ -0,0 +1,112 @@
+"""index question plain text
+
+Revision ID: a6d2e9f47c13
+Revises: f1a8c3d62e57
+Create Date: 2026-10-18 21:42:16.308514
+
+"""
+import html
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2e9f47c13'
+down_revision = 'f1a8c3d62e57'
+branch_labels = None
+depends_on = None
+
+# Поиск переводится с сырого text (с HTML-разметкой) на text_plain.
+# DDL — копия cp_app/search.py, миграция не зависит от кода приложения
+_HTML_TAG_RE = re.compile(r'<[^>]*>')
+
+
+def _search_ddl(column):
+    pg = [
+        "ALTER TABLE question ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('russian', coalesce({column}, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX ix_question_search_vector ON question "
+        "USING GIN (search_vector)",
+    ]
+    sqlite = [
+        "CREATE VIRTUAL TABLE question_fts USING fts5("
+        f"title, {column}, content='question', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER question_fts_ai AFTER INSERT ON question BEGIN "
+        f"INSERT INTO question_fts(rowid, title, {column}) "
+        f"VALUES (new.id, new.title, new.{column}); END",
+        "CREATE TRIGGER question_fts_ad AFTER DELETE ON question BEGIN "
+        f"INSERT INTO question_fts(question_fts, rowid, title, {column}) "
+        f"VALUES ('delete', old.id, old.title, old.{column}); END",
+        f"CREATE TRIGGER question_fts_au AFTER UPDATE OF title, {column} "
+        "ON question BEGIN "
+        f"INSERT INTO question_fts(question_fts, rowid, title, {column}) "
+        f"VALUES ('delete', old.id, old.title, old.{column}); "
+        f"INSERT INTO question_fts(rowid, title, {column}) "
+        f"VALUES (new.id, new.title, new.{column}); END",
+        # индекс по уже существующим вопросам
+        "INSERT INTO question_fts(question_fts) VALUES ('rebuild')",
+    ]
+    return {'postgresql': pg, 'sqlite': sqlite}
+
+
+def _drop_search(dialect):
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_question_search_vector')
+        op.execute('ALTER TABLE question DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('question_fts_ai', 'question_fts_ad', 'question_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS question_fts')
+
+
+def _create_search(dialect, column):
+    for statement in _search_ddl(column).get(dialect, []):
+        op.execute(statement)
+
+
+def _plain(value):
+    text = html.unescape(_HTML_TAG_RE.sub(' ', value or ''))
+    return ' '.join(text.split())
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    _drop_search(dialect)
+    # без batch_alter_table: пересоздание таблицы на SQLite не нужно
+    op.add_column('question', sa.Column('text_plain', sa.Text(), nullable=True))
+
+    question = sa.table(
+        'question',
+        sa.column('id', sa.Integer),
+        sa.column('text', sa.Text),
+        sa.column('text_html', sa.Text),
+        sa.column('text_plain', sa.Text),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(question.c.id, question.c.text, question.c.text_html)
+    ).all()
+    if rows:
+        connection.execute(
+            question.update()
+            .where(question.c.id == sa.bindparam('q_id'))
+            .values(text_plain=sa.bindparam('plain')),
+            [{'q_id': row.id, 'plain': _plain(row.text_html or row.text)}
+             for row in rows],
+        )
+    _create_search(dialect, 'text_plain')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    _drop_search(dialect)
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('text_plain')
+    # после пересоздания таблицы на SQLite триггеры создаются заново
+    _create_search(dialect, 'text')
@@ -0,0 +1,69 @@
+"""add question search
+
+Revision ID: b83e5d20f4c1
+Revises: e2b9f4a61c07
+Create Date: 2026-10-18 14:12:09.517730
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e5d20f4c1'
+down_revision = 'e2b9f4a61c07'
+branch_labels = None
+depends_on = None
+
+# Копия DDL из cp_app/search.py: миграция не должна зависеть от кода приложения.
+# Последующий batch_alter_table('question') на SQLite удалит триггеры FTS,
+# их придётся создать заново
+PG_DDL = [
+    "ALTER TABLE question ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX ix_question_search_vector ON question "
+    "USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE question_fts USING fts5("
+    "title, text, content='question', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER question_fts_ai AFTER INSERT ON question BEGIN "
+    "INSERT INTO question_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER question_fts_ad AFTER DELETE ON question BEGIN "
+    "INSERT INTO question_fts(question_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER question_fts_au AFTER UPDATE OF title, text ON question "
+    "BEGIN "
+    "INSERT INTO question_fts(question_fts, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO question_fts(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    # индекс по уже существующим вопросам
+    "INSERT INTO question_fts(question_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for statement in PG_DDL:
+            op.execute(statement)
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX ix_question_search_vector')
+        op.execute('ALTER TABLE question DROP COLUMN search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('question_fts_ai', 'question_fts_ad', 'question_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS question_fts')
@@ -4,3 +4,58 @@ import os
 class Config(object):
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI')
     SECRET_KEY = os.getenv('SECRET_KEY')
+    # Кеш отрендеренного Markdown: лимит памяти на воркер и путь к общему
+    # SQLite-файлу (относительно instance/), пустой путь — без общего уровня
+    RENDER_CACHE_BYTES = int(os.getenv('RENDER_CACHE_BYTES', 8 * 1024 * 1024))
+    RENDER_CACHE_PATH = os.getenv('RENDER_CACHE_PATH')
+    # Сколько секунд кешировать счётчик вопросов в шапке
+    QUESTION_COUNT_TTL = int(os.getenv('QUESTION_COUNT_TTL', 60))
+    # Сколько секунд кешировать блок «Что нового» на главной
+    NEWS_TTL = int(os.getenv('NEWS_TTL', 60))
+    # Сколько секунд кешировать список тегов с числом вопросов
+    TAG_CLOUD_TTL = int(os.getenv('TAG_CLOUD_TTL', 300))
+    # Сколько символов ответа читать из БД для превью в списках
+    NEWS_PREVIEW_LENGTH = int(os.getenv('NEWS_PREVIEW_LENGTH', 300))
+    ADMIN_PREVIEW_LENGTH = int(os.getenv('ADMIN_PREVIEW_LENGTH', 200))
+    # Пул id для случайных вопросов: как часто догружать новые id
+    # и как часто перечитывать весь список (ловит удаления в других воркерах)
+    QUESTION_POOL_REFRESH = int(os.getenv('QUESTION_POOL_REFRESH', 30))
+    QUESTION_POOL_RELOAD = int(os.getenv('QUESTION_POOL_RELOAD', 600))
+    # Хранилище состояния квиза ('sql' или 'memory') и срок жизни квиза
+    QUIZ_STORE = os.getenv('QUIZ_STORE', 'sql')
+    QUIZ_TTL = int(os.getenv('QUIZ_TTL', 6 * 60 * 60))
+    # Лимит памяти воркера на предзагруженные вопросы активных квизов
+    QUIZ_SNAPSHOT_BYTES = int(os.getenv('QUIZ_SNAPSHOT_BYTES', 16 * 1024 * 1024))
+    # Размер страницы /api/questions/ по умолчанию и максимальный
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+    # Сколько строк за раз читать из курсора при NDJSON-выгрузке
+    API_STREAM_BATCH = int(os.getenv('API_STREAM_BATCH', 500))
+    # Максимум id в одном пакетном запросе вопросов
+    API_BATCH_MAX = int(os.getenv('API_BATCH_MAX', 100))
+    # Максимум вопросов в одном запросе /api/questions/bulk
+    API_BULK_MAX = int(os.getenv('API_BULK_MAX', 1000))
+    # Сжатие ответов: уровни gzip (1-9) и brotli (0-11, если установлен),
+    # минимальный размер тела в байтах и сжимаемые типы
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', 5))
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_MIMETYPES = (
+        'text/html', 'application/json',
+        'text/css', 'application/javascript', 'image/svg+xml',
+    )
+    # Кеш ответов GET /api/questions/: лимит памяти воркера и как часто
+    # сверять версию коллекции с БД (записи других воркеров)
+    API_CACHE_BYTES = int(os.getenv('API_CACHE_BYTES', 32 * 1024 * 1024))
+    API_VERSION_TTL = int(os.getenv('API_VERSION_TTL', 5))
+    # Подсказки /api/suggest: полная перестройка индекса (ловит записи
+    # других воркеров) и число подсказок по умолчанию и максимальное
+    SUGGEST_RELOAD = int(os.getenv('SUGGEST_RELOAD', 600))
+    SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', 10))
+    SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', 20))
+    # Число вопросов по фильтрам списка /questions: сколько секунд
+    # кешировать и лимит памяти воркера; с какого размера таблицы на
+    # PostgreSQL брать оценку планировщика вместо COUNT(*)
+    LIST_COUNT_TTL = int(os.getenv('LIST_COUNT_TTL', 60))
+    LIST_COUNT_CACHE_BYTES = int(os.getenv('LIST_COUNT_CACHE_BYTES', 1024 * 1024))
+    LIST_ESTIMATE_MIN = int(os.getenv('LIST_ESTIMATE_MIN', 10000))
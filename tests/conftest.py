@@ -4,12 +4,14 @@
 import pytest
 import os
 import tempfile
+from contextlib import contextmanager
 
 # Устанавливаем переменные окружения ДО импорта приложения
 os.environ.setdefault('DATABASE_URI', 'sqlite:///:memory:')
 os.environ.setdefault('SECRET_KEY', 'test-secret-key')
 
 from cp_app import app, db
+from cp_app.cache import clear_caches
 from cp_app.models import User, Question
 
 
@@ -22,6 +24,8 @@ def client():
     app.config['TESTING'] = True
     app.config['SECRET_KEY'] = 'test-secret-key'
     app.config['WTF_CSRF_ENABLED'] = False  # Отключаем CSRF для тестов
+    app.config['QUIZ_STORE'] = 'memory'  # состояние квиза в памяти
+    clear_caches()  # кеши процесса не должны переживать пересоздание БД
 
     with app.test_client() as client:
         with app.app_context():
@@ -159,3 +163,24 @@ def admin_client(client, test_admin):
         'password': 'adminpass123'
     }, follow_redirects=True)
     return client
+
+
+@pytest.fixture
+def sql_statements(client):
+    """Контекстный менеджер: собирает SQL-запросы, выполненные внутри блока"""
+    engine = db.engine
+
+    @contextmanager
+    def capture():
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        db.event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            db.event.remove(engine, 'before_cursor_execute', listener)
+
+    return capture
@@ -4,7 +4,7 @@
 import pytest
 import json
 from cp_app import db
-from cp_app.models import Question
+from cp_app.models import Question, Tag
 
 
 class TestQuestionAPI:
@@ -19,6 +19,86 @@ class TestQuestionAPI:
         assert 'questions' in data
         assert len(data['questions']) == 15
 
+    def test_get_questions_keyset_pagination(self, client, multiple_questions):
+        """Тест постраничного обхода списка по курсору"""
+        seen = []
+        after_id = None
+        while True:
+            url = '/api/questions/?limit=4'
+            if after_id is not None:
+                url += f'&after_id={after_id}'
+            data = client.get(url).get_json()
+            assert len(data['questions']) <= 4
+            seen.extend(q['id'] for q in data['questions'])
+            after_id = data['next']
+            if after_id is None:
+                break
+
+        assert seen == sorted(q.id for q in multiple_questions)
+
+    def test_get_questions_default_page_size(self, client, multiple_questions):
+        """Тест размера страницы по умолчанию"""
+        client.application.config['API_PAGE_SIZE'] = 10
+        try:
+            data = client.get('/api/questions/').get_json()
+        finally:
+            client.application.config['API_PAGE_SIZE'] = 100
+        assert len(data['questions']) == 10
+        assert data['next'] == data['questions'][-1]['id']
+
+    @pytest.mark.parametrize('query', [
+        'limit=0', 'limit=100000', 'limit=abc', 'after_id=-1'
+    ])
+    def test_get_questions_invalid_params(self, client, query):
+        """Тест некорректных параметров пагинации"""
+        response = client.get(f'/api/questions/?{query}')
+        assert response.status_code == 400
+        assert 'message' in response.get_json()
+
+    def test_get_questions_loads_tags_in_one_query(
+        self, client, sql_statements
+    ):
+        """Тест отсутствия N+1 при загрузке тегов"""
+        with client.application.app_context():
+            tag = Tag(name='python')
+            for i in range(5):
+                db.session.add(Question(
+                    title=f'Tagged {i}?', text=f'tagged {i}', tags=[tag]
+                ))
+            db.session.commit()
+
+        with sql_statements() as statements:
+            data = client.get('/api/questions/').get_json()
+
+        assert all(q['tags'] == ['python'] for q in data['questions'])
+        assert len([sql for sql in statements if 'tag' in sql]) == 1
+
+    def test_get_questions_ndjson_stream(self, client, multiple_questions):
+        """Тест потоковой выгрузки в формате NDJSON"""
+        response = client.get('/api/questions/?format=ndjson')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+
+        lines = response.get_data(as_text=True).splitlines()
+        questions = [json.loads(line) for line in lines]
+        assert [q['id'] for q in questions] == \
+            sorted(q.id for q in multiple_questions)
+        assert set(questions[0]) == {'id', 'title', 'text', 'tags'}
+
+    def test_get_questions_ndjson_after_id(self, client, multiple_questions):
+        """Тест продолжения выгрузки с курсора"""
+        after_id = sorted(q.id for q in multiple_questions)[9]
+        response = client.get(
+            f'/api/questions/?format=ndjson&after_id={after_id}'
+        )
+        assert len(response.get_data(as_text=True).splitlines()) == 5
+
+    def test_get_questions_unknown_format(self, client):
+        """Тест неизвестного формата выгрузки"""
+        response = client.get('/api/questions/?format=xml')
+        assert response.status_code == 400
+
     def test_get_question_by_id(self, client, test_question):
         """Тест получения вопроса по ID"""
         # Сохраняем данные вопроса до запроса
@@ -170,6 +250,382 @@ class TestQuestionAPI:
         assert response.status_code == 404
 
 
+class TestConditionalGet:
+    """Тесты ETag / Last-Modified для API вопросов"""
+
+    def test_question_not_modified(
+        self, client, test_question, sql_statements
+    ):
+        """Тест ответа 304 на совпавший ETag вопроса"""
+        url = f'/api/questions/{test_question.id}/'
+        response = client.get(url)
+        etag = response.headers['ETag']
+        assert response.last_modified is not None
+
+        with sql_statements() as statements:
+            response = client.get(url, headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert response.data == b''
+        # сам вопрос не загружается — только его updated_at
+        assert not [sql for sql in statements if 'question.text' in sql]
+
+    def test_question_etag_changes_on_update(self, client, test_question):
+        """Тест смены ETag после правки вопроса"""
+        url = f'/api/questions/{test_question.id}/'
+        etag = client.get(url).headers['ETag']
+        client.patch(url, json={'text': 'Changed Answer'})
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_question_etag_changes_on_tags(self, client, test_question):
+        """Тест смены ETag после изменения тегов вопроса"""
+        url = f'/api/questions/{test_question.id}/'
+        etag = client.get(url).headers['ETag']
+        with client.application.app_context():
+            question = db.session.get(Question, test_question.id)
+            question.tags.append(Tag(name='python'))
+            db.session.commit()
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['question']['tags'] == ['python']
+
+    def test_question_if_modified_since(self, client, test_question):
+        """Тест If-Modified-Since без ETag"""
+        url = f'/api/questions/{test_question.id}/'
+        last_modified = client.get(url).headers['Last-Modified']
+        response = client.get(url, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+    def test_list_not_modified(self, client, multiple_questions):
+        """Тест ответа 304 для страницы списка"""
+        response = client.get('/api/questions/?limit=5')
+        etag = response.headers['ETag']
+
+        response = client.get(
+            '/api/questions/?limit=5', headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 304
+
+    @pytest.mark.parametrize('change', ['insert', 'update', 'delete'])
+    def test_list_etag_changes(self, client, multiple_questions, change):
+        """Тест смены версии коллекции при любой записи"""
+        etag = client.get('/api/questions/').headers['ETag']
+        question_id = multiple_questions[0].id
+        if change == 'insert':
+            client.post('/api/questions/', json={
+                'title': 'New?', 'text': 'New answer'
+            })
+        elif change == 'update':
+            client.patch(f'/api/questions/{question_id}/', json={
+                'title': 'Renamed?'
+            })
+        else:
+            client.delete(f'/api/questions/{question_id}/')
+
+        response = client.get(
+            '/api/questions/', headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+
+class TestBatchAPI:
+    """Тесты пакетного получения вопросов"""
+
+    def test_get_by_ids_in_request_order(self, client, multiple_questions):
+        """Тест ?ids= с сохранением порядка запроса"""
+        ids = [multiple_questions[i].id for i in (4, 0, 9)]
+        response = client.get(
+            '/api/questions/?ids=' + ','.join(map(str, ids))
+        )
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert [q['id'] for q in data['questions']] == ids
+        assert data['missing'] == []
+
+    def test_missing_ids_reported(self, client, multiple_questions):
+        """Тест отчёта о ненайденных id"""
+        question_id = multiple_questions[0].id
+        response = client.post('/api/questions/batch', json={
+            'ids': [99999, question_id, 99998]
+        })
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert [q['id'] for q in data['questions']] == [question_id]
+        assert data['missing'] == [99999, 99998]
+
+    def test_batch_single_query(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест одного IN-запроса на все вопросы пакета"""
+        with sql_statements() as statements:
+            client.post('/api/questions/batch', json={
+                'ids': [q.id for q in multiple_questions]
+            })
+
+        text_queries = [sql for sql in statements if 'question.text' in sql]
+        assert len(text_queries) == 1
+        assert ' IN (' in text_queries[0]
+
+    @pytest.mark.parametrize('payload', [
+        {}, {'ids': []}, {'ids': ['1']}, {'ids': [1.5]},
+        {'ids': list(range(1, 102))},
+    ])
+    def test_batch_invalid(self, client, payload):
+        """Тест некорректных пакетных запросов"""
+        response = client.post('/api/questions/batch', json=payload)
+        assert response.status_code == 400
+
+    def test_get_by_ids_invalid(self, client):
+        """Тест нечисловых id в ?ids="""
+        response = client.get('/api/questions/?ids=1,abc')
+        assert response.status_code == 400
+
+
+class TestSparseFields:
+    """Тесты выбора полей через ?fields="""
+
+    def test_list_id_title_only(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест проекции без текста и без запроса тегов"""
+        with sql_statements() as statements:
+            response = client.get('/api/questions/?fields=id,title')
+        assert response.status_code == 200
+
+        questions = response.get_json()['questions']
+        assert len(questions) == 15
+        assert set(questions[0]) == {'id', 'title'}
+        assert not [sql for sql in statements if 'question.text' in sql]
+        assert not [sql for sql in statements if 'question_tags' in sql]
+
+    def test_id_always_included(self, client, test_question):
+        """Тест того, что id возвращается и без явного запроса"""
+        response = client.get(
+            f'/api/questions/{test_question.id}/?fields=tags'
+        )
+        assert response.get_json()['question'] == {
+            'id': test_question.id, 'tags': []
+        }
+
+    def test_fields_with_tags(self, client):
+        """Тест тегов в проекции"""
+        with client.application.app_context():
+            question = Question(title='Tagged?', text='tagged',
+                                tags=[Tag(name='python'), Tag(name='sql')])
+            db.session.add(question)
+            db.session.commit()
+
+        response = client.get('/api/questions/?fields=title,tags')
+        assert response.get_json()['questions'] == [{
+            'id': 1, 'title': 'Tagged?', 'tags': ['python', 'sql']
+        }]
+
+    def test_fields_in_ndjson_and_batch(self, client, multiple_questions):
+        """Тест проекции в потоковой выгрузке и пакетном запросе"""
+        response = client.get('/api/questions/?format=ndjson&fields=title')
+        lines = response.get_data(as_text=True).splitlines()
+        assert set(json.loads(lines[0])) == {'id', 'title'}
+
+        response = client.post('/api/questions/batch?fields=text', json={
+            'ids': [multiple_questions[0].id]
+        })
+        assert set(response.get_json()['questions'][0]) == {'id', 'text'}
+
+    def test_unknown_field(self, client, test_question):
+        """Тест неизвестного поля"""
+        response = client.get('/api/questions/?fields=title,password')
+        assert response.status_code == 400
+        assert 'password' in response.get_json()['message']
+
+    def test_unknown_field_with_matching_etag(self, client, test_question):
+        """Тест неизвестного поля при совпавшем ETag: 400, а не 304"""
+        url = f'/api/questions/{test_question.id}/'
+        etag = client.get(url).headers['ETag']
+        response = client.get(
+            f'{url}?fields=bogus', headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 400
+        assert 'bogus' in response.get_json()['message']
+
+
+class TestBulkImportAPI:
+    """Тесты пакетного импорта вопросов"""
+
+    def test_bulk_create_update_skip(self, client, test_question):
+        """Тест статусов created/updated/skipped"""
+        with client.application.app_context():
+            db.session.add(Question(title='Same?', text='Same answer'))
+            db.session.commit()
+
+        response = client.post('/api/questions/bulk', json=[
+            {'title': 'New?', 'text': 'New *answer*', 'tags': ['Python']},
+            {'title': 'Test Question?', 'text': 'Changed Answer'},
+            {'title': 'Same?', 'text': 'Same answer'},
+        ])
+        assert response.status_code == 200
+
+        data = response.get_json()
+        assert [r['status'] for r in data['results']] == \
+            ['created', 'updated', 'skipped']
+        assert (data['created'], data['updated'], data['skipped']) == \
+            (1, 1, 1)
+        assert data['results'][1]['id'] == test_question.id
+
+        with client.application.app_context():
+            question = Question.query.filter_by(title='New?').first()
+            assert question.text_html == '<p>New <em>answer</em></p>'
+            assert [tag.name for tag in question.tags] == ['python']
+            updated = db.session.get(Question, test_question.id)
+            assert updated.text == 'Changed Answer'
+
+    def test_bulk_tags_diff(self, client):
+        """Тест обновления только тегов и повторного импорта без изменений"""
+        item = {'title': 'Tags?', 'text': 'tags', 'tags': ['a', 'b']}
+        client.post('/api/questions/bulk', json=[item])
+
+        item['tags'] = ['b', 'c']
+        data = client.post('/api/questions/bulk', json=[item]).get_json()
+        assert data['results'][0]['status'] == 'updated'
+
+        data = client.post('/api/questions/bulk', json=[item]).get_json()
+        assert data['results'][0]['status'] == 'skipped'
+
+        with client.application.app_context():
+            question = Question.query.filter_by(title='Tags?').first()
+            assert sorted(tag.name for tag in question.tags) == ['b', 'c']
+            assert Tag.query.count() == 3
+
+    def test_bulk_invalid_items_skipped(self, client, test_question):
+        """Тест ошибок в отдельных элементах"""
+        response = client.post('/api/questions/bulk', json=[
+            {'title': 'Only title?'},
+            {'title': 'Dup?', 'text': 'dup'},
+            {'title': 'Dup?', 'text': 'dup 2'},
+            {'title': 'Other title?', 'text': 'Test Answer'},
+        ])
+        assert response.status_code == 200
+
+        results = response.get_json()['results']
+        assert [r['status'] for r in results] == \
+            ['skipped', 'created', 'skipped', 'skipped']
+        assert all('error' in results[n] for n in (0, 2, 3))
+
+    def test_bulk_long_tag_skipped(self, client):
+        """Тест слишком длинного имени тега в отдельном элементе"""
+        response = client.post('/api/questions/bulk', json=[
+            {'title': 'Long tag?', 'text': 'a', 'tags': ['x' * 65]},
+            {'title': 'Short tag?', 'text': 'b', 'tags': ['x' * 64]},
+        ])
+        assert response.status_code == 200
+
+        results = response.get_json()['results']
+        assert [r['status'] for r in results] == ['skipped', 'created']
+        assert 'тега' in results[0]['error']
+        with client.application.app_context():
+            assert [tag.name for tag in Tag.query.all()] == ['x' * 64]
+
+    def test_bulk_updates_caches_and_version(self, client, test_question):
+        """Тест инвалидации кешей и версии коллекции при Core-записи"""
+        etag = client.get('/api/questions/').headers['ETag']
+        client.get('/main')
+
+        client.post('/api/questions/bulk', json=[
+            {'title': 'Cached?', 'text': 'cached'},
+        ])
+
+        response = client.get(
+            '/api/questions/', headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 200
+        assert 'Cached?' in client.get('/main').get_data(as_text=True)
+
+    @pytest.mark.parametrize('payload', [
+        {}, [], {'title': 'x'}, [{'title': 'x', 'text': 'y'}] * 1001,
+    ])
+    def test_bulk_invalid_payload(self, client, payload):
+        """Тест некорректного тела запроса"""
+        response = client.post('/api/questions/bulk', json=payload)
+        assert response.status_code == 400
+
+
+class TestResponseCache:
+    """Тесты кеша ответов API"""
+
+    def test_repeated_get_served_from_cache(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест повторного запроса без обращений к БД"""
+        first = client.get('/api/questions/?limit=5')
+        with sql_statements() as statements:
+            response = client.get('/api/questions/?limit=5')
+        assert statements == []
+        assert response.data == first.data
+        assert response.headers['ETag'] == first.headers['ETag']
+
+        # другой query string — другой ключ кеша
+        with sql_statements() as statements:
+            response = client.get('/api/questions/?limit=6')
+        assert len(response.get_json()['questions']) == 6
+        assert statements
+
+    def test_not_modified_from_cache(
+        self, client, test_question, sql_statements
+    ):
+        """Тест ответа 304 по закешированному ETag"""
+        url = f'/api/questions/{test_question.id}/'
+        etag = client.get(url).headers['ETag']
+        with sql_statements() as statements:
+            response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert statements == []
+
+    def test_invalidated_by_api_writes(self, client, test_question):
+        """Тест сброса кеша после POST/PATCH/DELETE"""
+        url = f'/api/questions/{test_question.id}/'
+        client.get(url)
+        client.patch(url, json={'title': 'Patched?'})
+        assert client.get(url).get_json()['question']['title'] == 'Patched?'
+
+        client.get('/api/questions/')
+        client.post('/api/questions/', json={'title': 'Posted?', 'text': 'p'})
+        titles = [q['title'] for q in
+                  client.get('/api/questions/').get_json()['questions']]
+        assert 'Posted?' in titles
+
+        client.delete(url)
+        assert client.get(url).status_code == 404
+
+    def test_invalidated_by_orm_commit(self, client, test_question):
+        """Тест сброса кеша при правке вне API (например, из админки)"""
+        url = f'/api/questions/{test_question.id}/'
+        client.get(url)
+        with client.application.app_context():
+            question = db.session.get(Question, test_question.id)
+            question.text = 'Edited in admin'
+            db.session.commit()
+
+        assert client.get(url).get_json()['question']['text'] == \
+            'Edited in admin'
+
+    def test_random_question_cached(
+        self, client, test_question, sql_statements
+    ):
+        """Тест случайного вопроса из кеша без запроса к БД"""
+        client.get('/api/get-random-question/')
+        with sql_statements() as statements:
+            response = client.get('/api/get-random-question/')
+        assert response.get_json()['opinion']['id'] == test_question.id
+        assert not [sql for sql in statements if 'question.text' in sql]
+
+
 class TestRandomQuestionAPI:
     """Тесты для API случайного вопроса"""
 
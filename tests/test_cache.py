@@ -0,0 +1,116 @@
+"""
+Тесты для кешей процесса
+"""
+import threading
+import time
+
+from cp_app import app, db, question_counter
+from cp_app.cache import CachedValue, LRUCache, SingleFlight
+from cp_app.models import Question
+
+
+class TestLRUCache:
+    """Тесты для LRUCache"""
+
+    def test_evicts_by_bytes(self):
+        """Тест вытеснения самых старых записей по размеру"""
+        cache = LRUCache(max_bytes=30, sizeof=lambda k, v: len(v))
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'x' * 10)
+        cache.get('a')  # 'a' становится самым свежим
+        cache.set('c', 'x' * 15)
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] == 25
+
+    def test_counters(self):
+        """Тест счётчиков попаданий и промахов"""
+        cache = LRUCache(max_bytes=1024)
+        cache.get('missing')
+        cache.set('key', 'value')
+        cache.get('key')
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['items']) == (1, 1, 1)
+
+
+class TestCachedValue:
+    """Тесты для CachedValue"""
+
+    def test_loads_once_until_invalidated(self):
+        """Тест, что значение загружается один раз до инвалидации"""
+        calls = []
+        value = CachedValue(lambda: calls.append(1) or len(calls), ttl=60)
+        assert value.get() == 1
+        assert value.get() == 1
+        value.invalidate()
+        assert value.get() == 2
+
+    def test_ttl_expiry(self):
+        """Тест устаревания значения по TTL"""
+        calls = []
+        value = CachedValue(lambda: calls.append(1) or len(calls), ttl=0)
+        value.get()
+        value.get()
+        assert len(calls) == 2
+
+
+class TestSingleFlight:
+    """Тесты для SingleFlight"""
+
+    def test_cold_key_loaded_once(self):
+        """Тест, что одновременные промахи по ключу грузят значение один раз"""
+        cache = LRUCache(max_bytes=1024)
+        flights = SingleFlight()
+        calls = []
+
+        def get():
+            if cache.get('key') is None:
+                with flights.lock('key'):
+                    if cache.get('key') is None:
+                        calls.append(1)
+                        time.sleep(0.05)
+                        cache.set('key', 'value')
+            return cache.get('key')
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert flights._locks == {}
+
+
+class TestQuestionCounter:
+    """Тесты для кешированного счётчика вопросов"""
+
+    def test_counter_invalidated_on_insert_and_delete(self, client):
+        """Тест пересчёта после добавления и удаления вопроса"""
+        with app.app_context():
+            assert question_counter.get() == (0, 'вопросов')
+            question = Question(title='Counted?', text='answer')
+            db.session.add(question)
+            db.session.commit()
+            assert question_counter.get() == (1, 'вопрос')
+
+            db.session.delete(question)
+            db.session.commit()
+            assert question_counter.get() == (0, 'вопросов')
+
+    def test_counter_not_invalidated_on_update(self, client, test_question):
+        """Тест, что правка вопроса не сбрасывает счётчик"""
+        with app.app_context():
+            question_counter.get()
+            invalidations = question_counter.invalidations
+            question = db.session.get(Question, test_question.id)
+            question.text = 'changed'
+            db.session.commit()
+            assert question_counter.invalidations == invalidations
+
+    def test_header_label(self, client, multiple_questions):
+        """Тест подписи в шапке"""
+        response = client.get('/main')
+        assert '15</strong> вопросов'.encode() in response.data
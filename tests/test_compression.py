@@ -0,0 +1,113 @@
+"""
+Тесты сжатия ответов и предсжатой статики
+"""
+import gzip
+import json
+
+import pytest
+from cp_app import app
+
+
+@pytest.fixture(autouse=True)
+def min_size(monkeypatch):
+    """Порог пониже, чтобы 15 тестовых вопросов попадали под сжатие"""
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 256)
+
+
+@pytest.fixture
+def static_css(monkeypatch, tmp_path):
+    """CSS-файл и его .gz-копия во временной папке статики
+
+    Исходники в cp_app/static не трогаем: при прерванном прогоне
+    файлы остались бы в дереве и попали бы в образ.
+    """
+    (tmp_path / 'css').mkdir()
+    path = tmp_path / 'css' / '_compression_test.css'
+    data = b'body { color: #333; }\n' * 100
+    path.write_bytes(data)
+    path.with_name(path.name + '.gz').write_bytes(gzip.compress(data))
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    return 'css/_compression_test.css', data
+
+
+class TestResponseCompression:
+    """Тесты сжатия HTML и JSON"""
+
+    def test_json_gzip(self, client, multiple_questions):
+        """Тест gzip-сжатия крупного JSON"""
+        plain = client.get('/api/questions/')
+        response = client.get(
+            '/api/questions/', headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert len(response.data) < len(plain.data)
+        assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+
+    def test_no_accept_encoding(self, client, multiple_questions):
+        """Тест ответа без сжатия, если клиент его не просил"""
+        response = client.get('/api/questions/')
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_small_response_not_compressed(self, client, test_question):
+        """Тест порога COMPRESS_MIN_SIZE"""
+        response = client.get(
+            f'/api/questions/{test_question.id}/',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        assert 'Content-Encoding' not in response.headers
+
+    def test_html_gzip(self, client, multiple_questions):
+        """Тест сжатия HTML-страниц"""
+        response = client.get('/main', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert b'</html>' in gzip.decompress(response.data)
+
+    def test_stream_not_compressed(self, client, multiple_questions):
+        """Тест того, что потоковая выгрузка не буферизуется ради сжатия"""
+        response = client.get(
+            '/api/questions/?format=ndjson',
+            headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.is_streamed
+        assert 'Content-Encoding' not in response.headers
+
+    def test_compressed_etag_revalidation(self, client, multiple_questions):
+        """Тест отдельного ETag у сжатого варианта и ответа 304 на него"""
+        headers = {'Accept-Encoding': 'gzip'}
+        plain_etag = client.get('/api/questions/').headers['ETag']
+        etag = client.get('/api/questions/', headers=headers).headers['ETag']
+        assert etag != plain_etag
+        assert etag.endswith('-gzip"')
+
+        response = client.get(
+            '/api/questions/', headers={**headers, 'If-None-Match': etag}
+        )
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+
+class TestPrecompressedStatic:
+    """Тесты отдачи предсжатой статики"""
+
+    def test_gz_sibling_served(self, client, static_css):
+        """Тест подмены файла на .gz-копию"""
+        filename, data = static_css
+        response = client.get(
+            f'/static/{filename}', headers={'Accept-Encoding': 'gzip, br'}
+        )
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert gzip.decompress(response.data) == data
+        response.close()
+
+    def test_plain_without_accept_encoding(self, client, static_css):
+        """Тест исходного файла для клиента без поддержки сжатия"""
+        filename, data = static_css
+        response = client.get(f'/static/{filename}')
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == data
+        response.close()
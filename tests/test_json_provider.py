@@ -0,0 +1,66 @@
+"""
+Тесты JSON-провайдера приложения
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from cp_app import app
+from cp_app import json_provider
+from cp_app.json_provider import FastJSONProvider
+
+PAYLOAD = {
+    'questions': [
+        {'id': 1, 'title': 'Что такое GIL?', 'text': 'Блокировка', 'tags': []},
+    ],
+    'next': None,
+    'when': datetime(2024, 5, 1, 12, 30),
+    'price': Decimal('1.50'),
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(request, monkeypatch):
+    """Провайдер с orjson и без него"""
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson не установлен')
+    return FastJSONProvider(app)
+
+
+class TestFastJSONProvider:
+    """Тесты совместимости с провайдером Flask по умолчанию"""
+
+    def test_same_data_as_default(self, provider):
+        """Тест совпадения результата со стандартным провайдером"""
+        expected = DefaultJSONProvider(app).dumps(PAYLOAD)
+        assert json.loads(provider.dumps(PAYLOAD)) == json.loads(expected)
+
+    def test_datetime_as_http_date(self, provider):
+        """Тест формата дат, как у Flask"""
+        data = json.loads(provider.dumps(PAYLOAD))
+        assert data['when'] == 'Wed, 01 May 2024 12:30:00 GMT'
+
+    def test_response(self, provider):
+        """Тест ответа с JSON-телом"""
+        with app.app_context():
+            response = provider.response(PAYLOAD)
+        assert response.mimetype == 'application/json'
+        assert response.get_data(as_text=True).endswith('\n')
+        assert json.loads(response.get_data()) == json.loads(
+            DefaultJSONProvider(app).dumps(PAYLOAD)
+        )
+
+    def test_loads(self, provider):
+        """Тест разбора JSON"""
+        assert provider.loads('{"a": [1, "б"]}') == {'a': [1, 'б']}
+
+    def test_app_uses_provider(self, client, test_question):
+        """Тест подключения провайдера к приложению"""
+        assert isinstance(app.json, FastJSONProvider)
+        response = client.get(f'/api/questions/{test_question.id}/')
+        assert response.get_json()['question']['title'] == 'Test Question?'
@@ -155,6 +155,50 @@ class TestQuestion:
             tag_names = sorted([t.name for t in stored.tags])
             assert tag_names == ['flask', 'python']
 
+    def test_question_html_rendered_on_insert(self, client):
+        """Тест, что HTML вопроса сохраняется при создании"""
+        with client.application.app_context():
+            question = Question(title='Markdown?', text='**bold** answer')
+            db.session.add(question)
+            db.session.commit()
+
+            assert question.title_html == '<p>Markdown?</p>'
+            assert '<strong>bold</strong>' in question.text_html
+
+    def test_question_html_rerendered_on_update(self, client):
+        """Тест, что HTML обновляется вместе с текстом"""
+        with client.application.app_context():
+            question = Question(title='Old?', text='old answer')
+            db.session.add(question)
+            db.session.commit()
+
+            question.text = '*new* answer'
+            db.session.commit()
+
+            assert '<em>new</em>' in question.text_html
+            assert question.title_html == '<p>Old?</p>'
+
+    def test_render_questions_command(self, client):
+        """Тест CLI-команды заполнения HTML у старых вопросов"""
+        with client.application.app_context():
+            question = Question(title='Legacy?', text='`code`')
+            db.session.add(question)
+            db.session.commit()
+            db.session.execute(
+                db.update(Question).values(title_html=None, text_html=None)
+            )
+            db.session.commit()
+            question_id = question.id
+
+        runner = client.application.test_cli_runner()
+        result = runner.invoke(args=['render_questions', '--workers', '1'])
+        assert result.exit_code == 0, result.output
+
+        with client.application.app_context():
+            stored = db.session.get(Question, question_id)
+            assert stored.title_html == '<p>Legacy?</p>'
+            assert '<code>code</code>' in stored.text_html
+
 
 class TestComment:
     """Тесты для модели Comment"""
@@ -203,3 +247,63 @@ class TestComment:
             assert comment.question == question
             assert comment in user.comments
             assert comment in question.comments
+
+
+class TestTagQuestionCount:
+    """Тесты счётчика Tag.question_count"""
+
+    def _counts(self):
+        return dict(db.session.execute(
+            db.select(Tag.name, Tag.question_count)
+        ).all())
+
+    def test_orm_changes(self, client):
+        """Тест пересчёта при добавлении, смене тегов и удалении вопроса"""
+        with client.application.app_context():
+            python, flask = Tag(name='python'), Tag(name='flask')
+            first = Question(title='Q1', text='A1', tags=[python, flask])
+            second = Question(title='Q2', text='A2', tags=[python])
+            db.session.add_all([first, second])
+            db.session.commit()
+            assert self._counts() == {'python': 2, 'flask': 1}
+            assert python.question_count == 2
+
+            second.tags.remove(python)
+            second.tags.append(flask)
+            db.session.commit()
+            assert self._counts() == {'python': 1, 'flask': 2}
+
+            db.session.delete(first)
+            db.session.commit()
+            assert self._counts() == {'python': 0, 'flask': 1}
+            assert flask.question_count == 1
+
+    def test_bulk_import(self, client):
+        """Тест пересчёта при записи связей через Core (пакетный импорт)"""
+        client.post('/api/questions/bulk', json=[
+            {'title': 'Q1', 'text': 'A1', 'tags': ['python', 'orm']},
+            {'title': 'Q2', 'text': 'A2', 'tags': ['python']},
+        ])
+        client.post('/api/questions/bulk', json=[
+            {'title': 'Q1', 'text': 'A1', 'tags': ['python']},
+        ])
+        with client.application.app_context():
+            assert self._counts() == {'python': 2, 'orm': 0}
+
+    def test_recount_locks_tags_first(self, client):
+        """Тест блокировки строк тегов перед пересчётом (PostgreSQL)"""
+        from sqlalchemy.dialects import postgresql
+
+        class Recorder:
+            def __init__(self):
+                self.statements = []
+
+            def execute(self, statement):
+                self.statements.append(str(statement.compile(
+                    dialect=postgresql.dialect())))
+
+        connection = Recorder()
+        Tag.recount(connection, {3, 1})
+        lock, update = connection.statements
+        assert lock.endswith('ORDER BY tag.id FOR UPDATE')
+        assert update.startswith('UPDATE tag SET question_count')
@@ -0,0 +1,67 @@
+"""
+Тесты для пула id случайных вопросов
+"""
+from cp_app import app, db
+from cp_app.models import Question
+from cp_app.question_pool import QuestionIdPool, question_pool
+
+
+def _insert_behind_orm(title):
+    """Вставка мимо ORM-событий — так пул видит вставки других воркеров"""
+    db.session.execute(db.insert(Question).values(title=title, text=title))
+    db.session.commit()
+    return db.session.scalar(db.select(Question.id).filter_by(title=title))
+
+
+class TestQuestionIdPool:
+    """Тесты для QuestionIdPool"""
+
+    def test_empty_pool(self, client):
+        """Тест пустого пула"""
+        with app.app_context():
+            assert question_pool.choice() is None
+            assert question_pool.random_question() is None
+            assert question_pool.sample(10) == []
+
+    def test_follows_orm_inserts_and_deletes(self, client, multiple_questions):
+        """Тест синхронизации пула с коммитами этого процесса"""
+        with app.app_context():
+            assert len(question_pool) == 15
+            reloads = question_pool.reloads
+
+            question = Question(title='Pooled?', text='pooled')
+            db.session.add(question)
+            db.session.commit()
+            assert question.id in question_pool.sample(16)
+
+            db.session.delete(question)
+            db.session.commit()
+            assert len(question_pool) == 15
+            assert question_pool.reloads == reloads
+
+    def test_watermark_catch_up(self, client, multiple_questions):
+        """Тест догрузки id, вставленных другим воркером"""
+        with app.app_context():
+            pool = QuestionIdPool(refresh_interval=0, reload_interval=3600)
+            assert len(pool) == 15
+            new_id = _insert_behind_orm('Other worker?')
+            assert new_id in pool.sample(16)
+            assert pool.reloads == 1
+
+    def test_sample_without_repeats(self, client, multiple_questions):
+        """Тест выборки без повторов"""
+        with app.app_context():
+            ids = question_pool.sample(10)
+            assert len(ids) == len(set(ids)) == 10
+            assert sorted(question_pool.sample(100)) == \
+                sorted(q.id for q in multiple_questions)
+
+    def test_stale_id_is_skipped(self, client, test_question):
+        """Тест, что удалённый в другом воркере вопрос не возвращается"""
+        with app.app_context():
+            pool = QuestionIdPool(refresh_interval=3600, reload_interval=3600)
+            pool.choice()
+            db.session.execute(db.delete(Question))
+            db.session.commit()
+            assert pool.random_question() is None
+            assert pool.stale_picks == 1
@@ -3,7 +3,18 @@
 """
 import pytest
 from cp_app import db
-from cp_app.models import Question
+from cp_app.models import Question, QuizSession
+from cp_app.quiz import quiz_snapshots
+from cp_app.quiz_store import QuizProgress, SQLQuizStore, quiz_store
+
+
+def _progress(client):
+    """Состояние квиза из серверного хранилища по id из cookie"""
+    with client.session_transaction() as sess:
+        quiz_id = sess.get('quiz_id')
+    if quiz_id is None:
+        return None
+    return quiz_store().load(quiz_id)
 
 
 class TestQuiz:
@@ -19,13 +30,14 @@ class TestQuiz:
         response = client.post('/quiz/begin', follow_redirects=True)
         assert response.status_code == 200
 
-        # Проверяем, что в сессии есть quiz_ids
+        # В cookie только непрозрачный id, состояние — на сервере
         with client.session_transaction() as sess:
-            assert 'quiz_ids' in sess
-            assert 'quiz_index' in sess
-            assert 'quiz_correct' in sess
-            assert 'quiz_total' in sess
-            assert len(sess['quiz_ids']) == 10
+            assert [k for k in sess if k.startswith('quiz')] == ['quiz_id']
+        progress = _progress(client)
+        assert len(progress.question_ids) == 10
+        assert progress.index == 0
+        assert progress.correct == 0
+        assert progress.total == 10
 
     def test_quiz_begin_less_than_10_questions(self, client):
         """Тест начала квиза, когда вопросов меньше 10"""
@@ -42,9 +54,60 @@ class TestQuiz:
         response = client.post('/quiz/begin', follow_redirects=True)
         assert response.status_code == 200
 
-        with client.session_transaction() as sess:
-            assert len(sess['quiz_ids']) == 5
-            assert sess['quiz_total'] == 5
+        progress = _progress(client)
+        assert len(progress.question_ids) == 5
+        assert progress.total == 5
+
+    def test_quiz_begin_uses_id_pool(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест, что квиз загружает только свои вопросы и одним запросом"""
+        with sql_statements() as statements:
+            client.post('/quiz/begin')
+
+        text_queries = [sql for sql in statements if 'question.text' in sql]
+        assert len(text_queries) == 1
+        assert ' IN (' in text_queries[0]
+
+    def test_quiz_steps_do_not_query_questions(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест, что шаги квиза берут вопросы из предзагруженного снимка"""
+        client.post('/quiz/begin')
+        with sql_statements() as statements:
+            for i in range(10):
+                client.get(f'/quiz/step/{i}')
+                client.post(f'/quiz/reveal/{i}')
+                client.post(f'/quiz/mark/{i}', data={'mark': 'answered'})
+            response = client.get('/quiz/finish')
+
+        assert response.status_code == 200
+        assert not any('question.text' in sql for sql in statements)
+
+    def test_quiz_snapshot_rebuilt_in_other_worker(
+        self, client, multiple_questions, sql_statements
+    ):
+        """Тест, что без снимка (другой воркер) вопросы догружаются пачкой"""
+        client.post('/quiz/begin')
+        quiz_snapshots.clear()
+        with sql_statements() as statements:
+            first = client.get('/quiz/step/0')
+            second = client.get('/quiz/step/1')
+
+        assert first.status_code == second.status_code == 200
+        assert len([sql for sql in statements
+                    if 'question.text' in sql]) == 1
+
+    def test_quiz_finish_keeps_quiz_order(self, client, multiple_questions):
+        """Тест порядка вопросов на финальной странице"""
+        client.post('/quiz/begin')
+        progress = _progress(client)
+        response = client.get('/quiz/finish')
+        body = response.data.decode('utf-8')
+        titles = {q.id: q.title for q in multiple_questions}
+        positions = [body.index(titles[q_id] + '\n')
+                     for q_id in progress.question_ids]
+        assert positions == sorted(positions)
 
     def test_quiz_step(self, client, multiple_questions):
         """Тест шага квиза"""
@@ -78,10 +141,9 @@ class TestQuiz:
         assert response.status_code == 200
 
         # Проверяем, что счётчик увеличился
-        with client.session_transaction() as sess:
-            assert sess['quiz_correct'] == 1
-            assert 'quiz_answers' in sess
-            assert sess['quiz_answers'][str(sess['quiz_ids'][0])] is True
+        progress = _progress(client)
+        assert progress.correct == 1
+        assert progress.is_answered(0) is True
 
     def test_quiz_mark_not_answered(self, client, multiple_questions):
         """Тест отметки неправильного ответа"""
@@ -97,11 +159,9 @@ class TestQuiz:
         assert response.status_code == 200
 
         # Проверяем, что счётчик не увеличился
-        with client.session_transaction() as sess:
-            assert sess['quiz_correct'] == 0
-            assert 'quiz_answers' in sess
-            assert (sess['quiz_answers'].get(str(sess['quiz_ids'][0]), False)
-                    is False)
+        progress = _progress(client)
+        assert progress.correct == 0
+        assert progress.is_answered(0) is False
 
     def test_quiz_finish(self, client, multiple_questions):
         """Тест завершения квиза"""
@@ -109,17 +169,16 @@ class TestQuiz:
         client.post('/quiz/begin')
 
         # Отмечаем все вопросы как отвеченные
-        with client.session_transaction() as sess:
-            for i in range(sess['quiz_total']):
-                client.post(f'/quiz/mark/{i}', data={'mark': 'answered'})
+        for i in range(_progress(client).total):
+            client.post(f'/quiz/mark/{i}', data={'mark': 'answered'})
 
         # Завершаем квиз
         response = client.get('/quiz/finish')
         assert response.status_code == 200
 
         # Проверяем статистику
-        with client.session_transaction() as sess:
-            assert sess['quiz_correct'] == sess['quiz_total']
+        progress = _progress(client)
+        assert progress.correct == progress.total
 
     def test_quiz_finish_shows_statistics(self, client, multiple_questions):
         """Тест, что финальная страница показывает статистику"""
@@ -145,17 +204,16 @@ class TestQuiz:
 
         # Проверяем, что сессия заполнена
         with client.session_transaction() as sess:
-            assert 'quiz_ids' in sess
+            quiz_id = sess['quiz_id']
 
         # Сбрасываем квиз
         response = client.post('/quiz/reset', follow_redirects=True)
         assert response.status_code == 200
 
-        # Проверяем, что сессия очищена
+        # Проверяем, что сессия и серверное состояние очищены
         with client.session_transaction() as sess:
-            assert 'quiz_ids' not in sess
-            assert 'quiz_index' not in sess
-            assert 'quiz_correct' not in sess
+            assert 'quiz_id' not in sess
+        assert quiz_store().load(quiz_id) is None
 
     def test_quiz_progression(self, client, multiple_questions):
         """Тест прохождения всего квиза"""
@@ -163,8 +221,7 @@ class TestQuiz:
         client.post('/quiz/begin')
 
         # Проходим все шаги
-        with client.session_transaction() as sess:
-            total = sess['quiz_total']
+        total = _progress(client).total
 
         for i in range(total):
             # Просматриваем вопрос
@@ -195,3 +252,58 @@ class TestQuiz:
                 data_str = response.data.decode(
                     'utf-8', errors='ignore').lower()
                 assert 'finish' in path_str or 'finish' in data_str
+
+    def test_quiz_without_session_redirects(self, client, multiple_questions):
+        """Тест, что шаг без начатого квиза ведёт на старт"""
+        response = client.get('/quiz/step/0')
+        assert response.status_code == 302
+        assert '/quiz/start' in response.headers['Location']
+
+    def test_quiz_step_out_of_range(self, client, multiple_questions):
+        """Тест шага за пределами квиза"""
+        client.post('/quiz/begin')
+        response = client.get('/quiz/step/10')
+        assert response.status_code == 404
+
+
+class TestQuizStore:
+    """Тесты для серверного хранилища квиза"""
+
+    def test_progress_encoding_roundtrip(self):
+        """Тест компактного бинарного кодирования прогресса"""
+        progress = QuizProgress([5, 17, 2**31 - 1, 3], index=2)
+        progress.mark(0, True)
+        progress.mark(3, True)
+        data = progress.encode()
+        # 4 байта заголовка + 4 id по 4 байта + 1 байт битовой карты
+        assert len(data) == 4 + 16 + 1
+
+        decoded = QuizProgress.decode(data)
+        assert decoded.question_ids == [5, 17, 2**31 - 1, 3]
+        assert decoded.index == 2
+        assert [decoded.is_answered(n) for n in range(4)] == \
+            [True, False, False, True]
+        assert decoded.correct == 2
+
+    def test_sql_store(self, client):
+        """Тест табличного хранилища"""
+        with client.application.app_context():
+            store = SQLQuizStore(ttl=60)
+            store.save('abc', QuizProgress([1, 2, 3]))
+            progress = store.load('abc')
+            progress.mark(1, True)
+            store.save('abc', progress)
+
+            assert store.load('abc').correct == 1
+            assert db.session.get(QuizSession, 'abc') is not None
+            store.delete('abc')
+            assert store.load('abc') is None
+
+    def test_sql_store_expiry(self, client):
+        """Тест удаления брошенных квизов по TTL"""
+        with client.application.app_context():
+            store = SQLQuizStore(ttl=-1)
+            store.save('old', QuizProgress([1]))
+            assert store.load('old') is None
+            assert store.purge_expired() == 1
+            assert db.session.get(QuizSession, 'old') is None
@@ -0,0 +1,114 @@
+"""
+Тесты для рендеринга Markdown
+"""
+import threading
+
+import markdown
+from bleach import clean
+
+from cp_app import app, render_cache
+from cp_app.rendering import (
+    ALLOWED_TAGS, MARKDOWN_EXTENSIONS, MarkdownRenderer, RenderCache,
+    SharedRenderStore, md_to_html
+)
+
+SAMPLE = """**Ответ** с кодом:
+
+```python
+print("hi")
+```
+
+<script>alert(1)</script>
+"""
+
+
+class TestMarkdownRenderer:
+    """Тесты для MarkdownRenderer"""
+
+    def test_matches_fresh_pipeline(self):
+        """Тест, что результат совпадает с созданием Markdown с нуля"""
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        expected = clean(md.convert(SAMPLE), tags=ALLOWED_TAGS, strip=True)
+        assert MarkdownRenderer().render(SAMPLE) == expected
+
+    def test_state_reset_between_documents(self):
+        """Тест, что состояние не переносится между документами"""
+        renderer = MarkdownRenderer()
+        first = renderer.render('[ссылка][1]\n\n[1]: https://example.com')
+        second = renderer.render('[ссылка][1]')
+        assert 'href="https://example.com"' in first
+        assert 'href' not in second
+        assert '<script>' not in renderer.render(SAMPLE)
+
+    def test_threads_get_consistent_output(self):
+        """Тест рендеринга из нескольких потоков"""
+        renderer = MarkdownRenderer()
+        expected = renderer.render(SAMPLE)
+        results = []
+
+        def worker():
+            for _ in range(20):
+                results.append(renderer.render(SAMPLE))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [expected] * 80
+
+    def test_jinja_filter(self):
+        """Тест, что фильтр markdown использует кеш рендеринга"""
+        assert app.jinja_env.filters['markdown'] == render_cache.render
+        assert md_to_html('*x*') == '<p><em>x</em></p>'
+
+
+class TestRenderCache:
+    """Тесты для RenderCache"""
+
+    def test_renders_once(self):
+        """Тест, что повторный рендер берётся из памяти"""
+        calls = []
+
+        class CountingRenderer(MarkdownRenderer):
+            def render(self, text):
+                calls.append(text)
+                return super().render(text)
+
+        cache = RenderCache(CountingRenderer(), max_bytes=1024 * 1024)
+        assert cache.render('**a**') == cache.render('**a**')
+        assert calls == ['**a**']
+        assert cache.stats()['hits'] == 1
+
+    def test_shared_tier_between_workers(self, tmp_path):
+        """Тест, что второй «воркер» получает HTML из общего уровня"""
+        path = str(tmp_path / 'render_cache.sqlite3')
+        first = RenderCache(MarkdownRenderer(), 1024 * 1024,
+                            shared=SharedRenderStore(path))
+        second = RenderCache(MarkdownRenderer(), 1024 * 1024,
+                             shared=SharedRenderStore(path))
+
+        html = first.render('`shared`')
+        assert second.render('`shared`') == html
+        assert second.stats()['shared']['hits'] == 1
+
+    def test_key_depends_on_renderer_version(self):
+        """Тест, что смена версии рендерера меняет ключ"""
+        renderer = MarkdownRenderer()
+        cache = RenderCache(renderer, 1024)
+        key = cache.key('text')
+        renderer.version = 'other'
+        assert cache.key('text') != key
+
+    def test_cache_stats_endpoint(self, admin_client):
+        """Тест эндпоинта со статистикой кешей"""
+        response = admin_client.get('/api/cache-stats/')
+        assert response.status_code == 200
+        assert 'markdown' in response.get_json()['caches']
+
+    def test_cache_stats_requires_admin(self, authenticated_client):
+        """Тест, что статистика кешей недоступна без прав администратора"""
+        response = authenticated_client.get('/api/cache-stats/')
+        assert response.status_code == 403
+        authenticated_client.get('/logout')
+        assert authenticated_client.get('/api/cache-stats/').status_code == 403
@@ -0,0 +1,126 @@
+"""
+Тесты для подсказок /api/suggest
+"""
+import time
+
+from cp_app import app, db
+from cp_app.models import Question, Tag
+from cp_app.suggest import suggest_index
+
+
+def _add_questions(*titles, tags=()):
+    with app.app_context():
+        tag_objects = [Tag(name=name) for name in tags]
+        questions = [Question(title=title, text=f'Ответ: {title}',
+                              tags=tag_objects)
+                     for title in titles]
+        db.session.add_all(questions)
+        db.session.commit()
+        return [question.id for question in questions]
+
+
+class TestSuggestAPI:
+    """Тесты для эндпоинта /api/suggest"""
+
+    def test_prefix_of_any_word(self, client):
+        """Тест поиска по началу любого слова заголовка без учёта регистра"""
+        _add_questions('Как работают генераторы?', 'Что такое GIL?')
+
+        response = client.get('/api/suggest?q=ГЕНЕР')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [q['title'] for q in data['questions']] == \
+            ['Как работают генераторы?']
+
+        data = client.get('/api/suggest?q=что так').get_json()
+        assert [q['title'] for q in data['questions']] == ['Что такое GIL?']
+
+    def test_tags(self, client):
+        """Тест подсказок по тегам"""
+        _add_questions('Вопрос', tags=('python', 'postgres', 'django'))
+
+        data = client.get('/api/suggest?q=p').get_json()
+        assert data['tags'] == ['postgres', 'python']
+
+    def test_empty_query(self, client):
+        """Тест пустого запроса"""
+        _add_questions('Вопрос')
+
+        data = client.get('/api/suggest?q=%20').get_json()
+        assert data == {'questions': [], 'tags': []}
+
+    def test_limit(self, client):
+        """Тест ограничения числа подсказок"""
+        _add_questions(*[f'Вопрос {i}' for i in range(30)])
+
+        data = client.get('/api/suggest?q=вопр').get_json()
+        assert len(data['questions']) == app.config['SUGGEST_LIMIT']
+
+        data = client.get('/api/suggest?q=вопр&limit=3').get_json()
+        assert len(data['questions']) == 3
+
+        response = client.get('/api/suggest?q=вопр&limit=1000')
+        assert response.status_code == 400
+
+    def test_long_query(self, client):
+        """Тест запроса длиннее ключей индекса"""
+        title = 'Чем отличается многопоточность от многопроцессности в Python'
+        _add_questions(title, 'Чем отличается многопоточность от asyncio')
+
+        data = client.get(
+            '/api/suggest?q=чем отличается многопоточность от многопр'
+        ).get_json()
+        assert [q['title'] for q in data['questions']] == [title]
+
+    def test_incremental_updates(self, client):
+        """Тест обновления индекса после вставки, правки и удаления"""
+        ids = _add_questions('Декораторы')
+        assert client.get('/api/suggest?q=декор').get_json()['questions']
+        reloads = suggest_index.reloads
+
+        _add_questions('Дескрипторы')
+        data = client.get('/api/suggest?q=де').get_json()
+        assert len(data['questions']) == 2
+
+        with app.app_context():
+            question = db.session.get(Question, ids[0])
+            question.title = 'Замыкания'
+            db.session.commit()
+        assert not client.get('/api/suggest?q=декор').get_json()['questions']
+        assert client.get('/api/suggest?q=замык').get_json()['questions']
+
+        with app.app_context():
+            db.session.delete(db.session.get(Question, ids[0]))
+            db.session.commit()
+        assert not client.get('/api/suggest?q=замык').get_json()['questions']
+        # Изменения подхвачены без полной перестройки
+        assert suggest_index.reloads == reloads
+
+    def test_new_tags_from_api(self, client):
+        """Тест тегов, созданных Core-вставкой пакетного импорта"""
+        _add_questions('Вопрос')
+        client.get('/api/suggest?q=вопр')
+
+        response = client.post('/api/questions/bulk', json=[
+            {'title': 'Новый', 'text': 'Ответ', 'tags': ['redis']},
+        ])
+        assert response.status_code == 200
+        assert client.get('/api/suggest?q=red').get_json()['tags'] == \
+            ['redis']
+
+
+class TestSuggestIndex:
+    """Тесты для SuggestIndex"""
+
+    def test_lookup_is_fast(self, client):
+        """Тест, что поиск по индексу не ходит в БД и укладывается в бюджет"""
+        _add_questions(*[f'Вопрос номер {i} про python' for i in range(2000)])
+        with app.app_context():
+            suggest_index.suggest('python', 10)  # первичная загрузка
+
+            started = time.perf_counter()
+            for _ in range(100):
+                suggest_index.suggest('вопрос номер 1', 10)
+            elapsed = (time.perf_counter() - started) / 100
+
+        assert elapsed < 0.005
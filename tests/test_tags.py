@@ -0,0 +1,110 @@
+"""
+Тесты для синхронизации тегов вопросов
+"""
+from sqlalchemy import event
+
+from cp_app import app, db
+from cp_app.models import Question, Tag
+from cp_app.tags import resolve_tag_ids, set_question_tags
+
+
+def _tag_names(question_id):
+    question = db.session.get(Question, question_id)
+    return sorted(tag.name for tag in question.tags)
+
+
+class TestResolveTagIds:
+    """Тесты для resolve_tag_ids"""
+
+    def test_one_query_for_existing(self, client, sql_statements):
+        """Тест одного IN-запроса для уже существующих тегов"""
+        with app.app_context():
+            db.session.add_all(Tag(name=f'tag{i}') for i in range(10))
+            db.session.commit()
+
+            with sql_statements() as statements:
+                ids = resolve_tag_ids([f'tag{i}' for i in range(10)])
+            assert len(ids) == 10
+            assert len(statements) == 1
+
+    def test_tag_created_concurrently(self, client):
+        """Тест тега, который другая транзакция создала раньше нас"""
+        with app.app_context():
+            engine = db.engine
+            raced = []
+
+            def race(conn, cursor, statement, *args):
+                if statement.startswith('INSERT INTO tag') and not raced:
+                    raced.append(True)
+                    with engine.begin() as other:
+                        other.execute(Tag.__table__.insert(), {'name': 'new'})
+
+            event.listen(engine, 'before_cursor_execute', race)
+            try:
+                ids = resolve_tag_ids(['new', 'other'])
+                db.session.commit()
+            finally:
+                event.remove(engine, 'before_cursor_execute', race)
+
+            assert set(ids) == {'new', 'other'}
+            assert db.session.scalar(
+                db.select(db.func.count(Tag.id)).where(Tag.name == 'new')
+            ) == 1
+
+
+class TestSetQuestionTags:
+    """Тесты для set_question_tags"""
+
+    def _question(self, *tags):
+        question = Question(title='Вопрос', text='Ответ')
+        set_question_tags(question, tags)
+        db.session.add(question)
+        db.session.commit()
+        return question.id
+
+    def test_creates_missing_tags(self, client):
+        """Тест создания новых тегов и очистки имён"""
+        with app.app_context():
+            db.session.add(Tag(name='python'))
+            db.session.commit()
+            question_id = self._question(' Python ', 'orm', 'ORM', '')
+            assert _tag_names(question_id) == ['orm', 'python']
+            assert db.session.scalar(db.select(db.func.count(Tag.id))) == 2
+
+    def test_only_changed_links_written(self, client, sql_statements):
+        """Тест, что меняются только отличающиеся связи"""
+        with app.app_context():
+            question_id = self._question('python', 'flask', 'orm')
+            question = db.session.get(Question, question_id)
+
+            with sql_statements() as statements:
+                set_question_tags(question, ['python', 'flask', 'orm'])
+                db.session.commit()
+            assert not any('question_tags' in s and
+                           s.startswith(('INSERT', 'DELETE'))
+                           for s in statements)
+
+            with sql_statements() as statements:
+                set_question_tags(question, ['python', 'orm', 'sql'])
+                db.session.commit()
+            writes = [s for s in statements if 'question_tags' in s and
+                      s.startswith(('INSERT', 'DELETE'))]
+            assert len(writes) == 2
+            assert _tag_names(question_id) == ['orm', 'python', 'sql']
+
+    def test_api_tags(self, client):
+        """Тест тегов при создании и правке вопроса через API"""
+        response = client.post('/api/questions/', json={
+            'title': 'Вопрос', 'text': 'Ответ', 'tags': ['python', 'orm'],
+        })
+        assert response.status_code == 201
+        question = response.get_json()['question']
+        assert sorted(question['tags']) == ['orm', 'python']
+
+        response = client.patch(f"/api/questions/{question['id']}/",
+                                json={'tags': ['sql']})
+        assert response.get_json()['question']['tags'] == ['sql']
+
+        response = client.patch(f"/api/questions/{question['id']}/",
+                                json={'tags': 'sql'})
+        assert response.status_code == 400
@@ -1,6 +1,8 @@
 """
 Тесты для views (веб-страницы, аутентификация, CRUD)
 """
+import re
+
 import pytest
 from cp_app import db
 from cp_app.models import User, Question, Comment, Tag
@@ -209,3 +211,465 @@ class TestComments:
             comment = Comment.query.filter_by(text='My test comment').first()
             assert comment is not None
             assert comment.question_id == question_id
+
+
+class TestNews:
+    """Тесты для блока «Что нового»"""
+
+    def test_main_page_shows_latest(self, client, test_user, test_question):
+        """Тест, что на главной видны свежие вопросы и комментарии"""
+        with client.application.app_context():
+            db.session.add(Comment(
+                text='Fresh comment',
+                user_id=test_user.id,
+                question_id=test_question.id
+            ))
+            db.session.commit()
+
+        response = client.get('/main')
+        body = response.data.decode('utf-8')
+        assert test_question.title in body
+        assert 'Fresh comment' in body
+        assert test_user.username in body
+
+    def test_news_loaded_lazily(self, client, test_question):
+        """Тест, что страницы без блока новостей не делают запросов"""
+        from cp_app.views import latest_comments, latest_questions
+        before = (latest_questions.stats(), latest_comments.stats())
+        client.get('/login')
+        assert (latest_questions.stats(), latest_comments.stats()) == before
+
+    def test_news_invalidated_on_new_question(self, client, test_question):
+        """Тест обновления снимка после добавления вопроса"""
+        client.get('/main')
+        with client.application.app_context():
+            db.session.add(Question(title='Newest?', text='newest answer'))
+            db.session.commit()
+
+        response = client.get('/main')
+        assert b'Newest?' in response.data
+
+
+class TestSearch:
+    """Тесты полнотекстового поиска на странице вопросов"""
+
+    def _add(self, client, *questions):
+        with client.application.app_context():
+            db.session.add_all(
+                Question(title=title, text=text) for title, text in questions
+            )
+            db.session.commit()
+
+    def _titles(self, response):
+        return re.findall(r'\d+\. ([^<\n]+?)\s*</a>', response.get_data(
+            as_text=True
+        ))
+
+    def test_ranked_title_first(self, client):
+        """Тест ранжирования: совпадение в заголовке выше, чем в тексте"""
+        self._add(
+            client,
+            ('Что такое GIL?', 'Глобальная блокировка интерпретатора.'),
+            ('Потоки в Python', 'Потоки ограничены GIL при вычислениях.'),
+            ('Декораторы', 'Функции высшего порядка.'),
+        )
+        titles = self._titles(client.get('/questions?search=gil'))
+        assert titles == ['Что такое GIL?', 'Потоки в Python']
+
+    def test_prefix_and_case(self, client):
+        """Тест поиска по началу слова без учёта регистра"""
+        self._add(client, ('Генераторы', 'Ленивые ВЫЧИСЛЕНИЯ через yield.'))
+        response = client.get('/questions?search=вычисл')
+        assert self._titles(response) == ['Генераторы']
+
+    def test_snippet_escaped_and_highlighted(self, client):
+        """Тест экранирования сниппета и подсветки совпадений"""
+        self._add(client, (
+            'XSS', 'Не вставляйте `<script>alert(1)</script>` в шаблон.'
+        ))
+        body = client.get('/questions?search=шаблон').get_data(as_text=True)
+        assert '<mark>шаблон</mark>' in body
+        assert '<script>alert' not in body
+        assert '&lt;script&gt;' in body
+
+    def test_html_answer_indexed_as_text(self, client):
+        """Тест, что индекс и сниппеты строятся по ответу без разметки"""
+        self._add(
+            client,
+            ('Генераторы', '<p>Ответ про <strong>генераторы</strong>.</p>'),
+            ('Декораторы', '<p>Функции высшего порядка.</p>'),
+        )
+        body = client.get('/questions?search=генератор').get_data(
+            as_text=True)
+        snippet = re.search(r'search-snippet">(.*?)</div>', body).group(1)
+        assert '&lt;' not in snippet
+        assert '<mark>генераторы</mark>' in snippet
+
+        assert self._titles(client.get('/questions?search=p')) == []
+        assert self._titles(client.get('/questions?search=strong')) == []
+
+    def test_fts_syntax_not_interpreted(self, client, multiple_questions):
+        """Тест, что операторы FTS5 в запросе не ломают поиск"""
+        response = client.get('/questions?search="Answer" OR NEAR(*')
+        assert response.status_code == 200
+
+    def test_index_follows_updates_and_deletes(self, client, test_question):
+        """Тест синхронизации индекса с правками и удалением"""
+        client.patch(f'/api/questions/{test_question.id}/',
+                     json={'text': 'Контекстные менеджеры'})
+        assert self._titles(client.get('/questions?search=менеджеры')) == \
+            ['Test Question?']
+        assert self._titles(client.get('/questions?search=Answer')) == []
+
+        client.delete(f'/api/questions/{test_question.id}/')
+        assert self._titles(client.get('/questions?search=менеджеры')) == []
+
+    def test_bulk_import_indexed(self, client):
+        """Тест индексации вопросов, записанных через Core"""
+        client.post('/api/questions/bulk', json=[
+            {'title': 'Импорт', 'text': 'Индексируется триггером'},
+        ])
+        assert self._titles(client.get('/questions?search=триггером')) == \
+            ['Импорт']
+
+    def test_search_with_tag_and_pages(self, client):
+        """Тест поиска вместе с фильтром по тегу и пагинацией"""
+        with client.application.app_context():
+            tag = Tag(name='python')
+            for i in range(25):
+                question = Question(title=f'Генератор {i}', text=f'yield {i}')
+                if i % 2 == 0:
+                    question.tags.append(tag)
+                db.session.add(question)
+            db.session.commit()
+
+        first = client.get('/questions?search=генератор&tag=python')
+        assert len(self._titles(first)) == 13
+
+        page_1 = self._titles(client.get('/questions?search=генератор'))
+        page_2 = self._titles(client.get('/questions?search=генератор&page=2'))
+        assert (len(page_1), len(page_2)) == (20, 5)
+        assert not set(page_1) & set(page_2)
+
+    def test_autogenerate_keeps_search_objects(self, client):
+        """Тест, что autogenerate не предлагает удалить объекты поиска"""
+        from alembic.autogenerate import compare_metadata
+        from alembic.migration import MigrationContext
+        from cp_app.search import include_schema_name
+
+        with client.application.app_context():
+            with db.engine.connect() as connection:
+                context = MigrationContext.configure(
+                    connection, opts={'include_name': include_schema_name})
+                diff = compare_metadata(context, db.metadata)
+        search_objects = (
+            'question_fts', 'search_vector', 'ix_question_search_vector'
+        )
+        assert not [op for op in diff
+                    if any(name in str(op) for name in search_objects)]
+
+
+class TestKeysetPagination:
+    """Тесты постраничного просмотра списка вопросов по курсору"""
+
+    def _add(self, client, count, tag=None, start=0):
+        with client.application.app_context():
+            tag = Tag(name=tag) if tag else None
+            for i in range(start, start + count):
+                question = Question(title=f'Вопрос {i}', text=f'Ответ {i}')
+                if tag is not None and i % 2 == 0:
+                    question.tags.append(tag)
+                db.session.add(question)
+            db.session.commit()
+
+    def _ids(self, response):
+        return [int(i) for i in re.findall(
+            r'(\d+)\. [^<\n]+?\s*</a>', response.get_data(as_text=True)
+        )]
+
+    def _link(self, response, label):
+        body = response.get_data(as_text=True)
+        match = re.search(
+            r'href="([^"]+)">\s*(?:<span[^>]*>[^<]*</span>\s*)?' + label, body
+        )
+        return match.group(1).replace('&amp;', '&') if match else None
+
+    def test_walk_forward_and_back(self, client):
+        """Тест обхода всех страниц по ссылкам «Вперед» и «Назад»"""
+        self._add(client, 45)
+
+        seen, pages, url = [], [], '/questions'
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            pages.append(self._ids(response))
+            seen.extend(pages[-1])
+            url = self._link(response, 'Вперед')
+        assert seen == list(range(1, 46))
+        assert [len(ids) for ids in pages] == [20, 20, 5]
+
+        back = client.get(self._link(response, 'Назад'))
+        assert self._ids(back) == pages[1]
+        assert 'pagination-active">2<' in back.get_data(as_text=True)
+
+    def test_cursor_pages_use_no_offset(self, client, sql_statements):
+        """Тест, что страницы по курсору ищутся по id без OFFSET и COUNT"""
+        self._add(client, 65)
+        client.get('/questions')  # счётчик попадает в кеш
+
+        with sql_statements() as statements:
+            response = client.get('/questions?page=3&after=20&skip=1')
+
+        assert self._ids(response) == list(range(41, 61))
+        selects = [s for s in statements if 'question.title' in s]
+        assert len(selects) == 1
+        assert 'question.id >' in selects[0]
+        assert not any('count(' in s.lower() for s in statements)
+
+    def test_last_page_and_numbers(self, client):
+        """Тест ссылки на последнюю страницу и нумерации"""
+        self._add(client, 130)
+
+        body = client.get('/questions').get_data(as_text=True)
+        assert 'last=1' in body
+
+        response = client.get('/questions?page=7&last=1')
+        assert self._ids(response) == list(range(121, 131))
+        assert 'pagination-active">7<' in response.get_data(as_text=True)
+
+    def test_last_page_with_stale_count(self, client):
+        """Тест последней страницы при устаревшем кеше числа вопросов"""
+        from cp_app.pagination import filter_counts
+        self._add(client, 55)
+        client.get('/questions')
+        # так кеш выглядит после записей другого воркера
+        key = ('list', (), 'all')
+        filter_counts.set(key, (45, filter_counts.get(key)[1]))
+
+        response = client.get('/questions?page=3&last=1')
+        assert self._ids(response) == list(range(41, 56))
+        assert 'pagination-active">3<' in response.get_data(as_text=True)
+
+    def test_legacy_page_links(self, client):
+        """Тест старых ссылок ?page=N и несуществующей страницы"""
+        self._add(client, 25)
+
+        assert self._ids(client.get('/questions?page=2')) == \
+            list(range(21, 26))
+        assert client.get('/questions?page=5').status_code == 404
+
+    def test_tag_filter_with_cursor(self, client):
+        """Тест курсора вместе с фильтром по тегу"""
+        self._add(client, 60, tag='python')
+
+        first = client.get('/questions?tag=python')
+        assert self._ids(first) == list(range(1, 41, 2))
+        second = client.get(self._link(first, 'Вперед'))
+        assert 'tag=python' in self._link(first, 'Вперед')
+        assert self._ids(second) == list(range(41, 61, 2))
+
+    def test_count_cache_invalidated_on_write(self, client):
+        """Тест сброса кеша числа вопросов после записи"""
+        self._add(client, 20)
+        assert self._link(client.get('/questions'), 'Вперед') is None
+
+        self._add(client, 21, start=20)
+        body = client.get('/questions').get_data(as_text=True)
+        assert 'page=3&amp;last=1">3</a>' in body
+
+
+class TestListLoading:
+    """Тесты, что списки вопросов не читают ответы целиком"""
+
+    ANSWER = 'Очень длинный ответ. ' * 5000
+
+    def _add(self, client, count):
+        with client.application.app_context():
+            db.session.add_all(
+                Question(title=f'Вопрос {i}', text=f'{i}. {self.ANSWER}')
+                for i in range(count)
+            )
+            db.session.commit()
+
+    def _reads_text(self, statement):
+        # Превью через substr(question.text, ...) допустимо
+        statement = re.sub(r'substr\(question\.text\b', '', statement)
+        return re.search(r'question\.text\b', statement) is not None
+
+    def test_list_page(self, client, sql_statements):
+        """Тест страницы списка: одна выборка без столбца text"""
+        self._add(client, 25)
+
+        with sql_statements() as statements:
+            response = client.get('/questions')
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert 'Вопрос 0' in body
+        assert not any(self._reads_text(s) for s in statements)
+        assert len([s for s in statements if 'question.title' in s]) == 1
+
+    def test_latest_questions_preview(self, client, sql_statements):
+        """Тест блока «Новые вопросы»: из БД читается только начало ответа"""
+        self._add(client, 5)
+
+        with sql_statements() as statements:
+            response = client.get('/main')
+        assert response.status_code == 200
+        assert 'Очень длинный ответ' in response.get_data(as_text=True)
+        assert not any(self._reads_text(s) for s in statements)
+        assert any('substr(question.text' in s for s in statements)
+        assert len(response.get_data()) < len(self.ANSWER)
+
+    def test_admin_list(self, admin_client, sql_statements):
+        """Тест списка вопросов в админке: превью вместо ответа"""
+        self._add(admin_client, 5)
+
+        with sql_statements() as statements:
+            response = admin_client.get('/admin/question/')
+        assert response.status_code == 200
+        body = response.get_data(as_text=True)
+        assert 'Вопрос 4' in body
+        assert 'Очень длинный ответ' in body
+        assert len(body) < len(self.ANSWER)
+        assert not any(self._reads_text(s) for s in statements)
+
+
+class TestTagCloud:
+    """Тесты списка тегов на странице вопросов"""
+
+    def _add(self, client):
+        with client.application.app_context():
+            python, empty = Tag(name='python'), Tag(name='empty')
+            db.session.add_all([
+                Question(title='Q1', text='A1', tags=[python]),
+                Question(title='Q2', text='A2', tags=[python]),
+                empty,
+            ])
+            db.session.commit()
+
+    def test_counts_shown_and_empty_hidden(self, client):
+        """Тест числа вопросов у тегов и скрытия пустых тегов"""
+        self._add(client)
+
+        body = client.get('/questions').get_data(as_text=True)
+        assert 'python<span class="tag-count">2</span>' in body
+        assert 'tag=empty' not in body
+
+    def test_cached_until_tags_change(self, client, sql_statements):
+        """Тест кеша списка тегов и его сброса при смене связей"""
+        self._add(client)
+        client.get('/questions')
+
+        with sql_statements() as statements:
+            client.get('/questions')
+        assert not any('tag.question_count' in s for s in statements)
+
+        with client.application.app_context():
+            question = db.session.scalar(
+                db.select(Question).where(Question.title == 'Q1'))
+            question.tags.append(
+                db.session.scalar(db.select(Tag).where(Tag.name == 'empty')))
+            db.session.commit()
+
+        body = client.get('/questions').get_data(as_text=True)
+        assert 'empty<span class="tag-count">1</span>' in body
+
+    def test_admin_form_without_count(self, admin_client):
+        """Тест формы тега в админке: счётчик не редактируется"""
+        self._add(admin_client)
+
+        body = admin_client.get('/admin/tag/').get_data(as_text=True)
+        assert 'Question Count' in body
+
+        body = admin_client.get('/admin/tag/new/').get_data(as_text=True)
+        assert 'name="name"' in body
+        assert 'name="question_count"' not in body
+
+
+class TestMultiTagFilter:
+    """Тесты фильтра по нескольким тегам"""
+
+    def _add(self, client):
+        with client.application.app_context():
+            python, flask, orm = (Tag(name=name)
+                                  for name in ('python', 'flask', 'orm'))
+            db.session.add_all([
+                Question(title='Потоки', text='GIL', tags=[python]),
+                Question(title='Блюпринты', text='Роуты', tags=[python, flask]),
+                Question(title='Сессии', text='ORM', tags=[python, flask, orm]),
+                Question(title='Миграции', text='Alembic', tags=[orm]),
+            ])
+            db.session.commit()
+
+    def _titles(self, response):
+        return re.findall(r'\d+\. ([^<\n]+?)\s*</a>', response.get_data(
+            as_text=True
+        ))
+
+    def test_all_and_any(self, client):
+        """Тест пересечения (mode=all) и объединения (mode=any) тегов"""
+        self._add(client)
+
+        assert self._titles(client.get(
+            '/questions?tag=python&tag=flask')) == ['Блюпринты', 'Сессии']
+        assert self._titles(client.get(
+            '/questions?tag=flask&tag=orm&mode=all')) == ['Сессии']
+        assert self._titles(client.get(
+            '/questions?tag=flask&tag=orm&mode=any'
+        )) == ['Блюпринты', 'Сессии', 'Миграции']
+
+    def test_unknown_tag_and_mode(self, client):
+        """Тест несуществующего тега и неизвестного режима"""
+        self._add(client)
+
+        assert self._titles(client.get(
+            '/questions?tag=python&tag=nope')) == []
+        assert self._titles(client.get(
+            '/questions?tag=python&tag=orm&mode=xor')) == ['Сессии']
+
+    def test_tag_case_and_duplicates(self, client):
+        """Тест имён тегов в другом регистре и повторов"""
+        self._add(client)
+
+        assert self._titles(client.get(
+            '/questions?tag=Python&tag=FLASK')) == ['Блюпринты', 'Сессии']
+        assert self._titles(client.get(
+            '/questions?tag=Python&tag=python&mode=all'
+        )) == ['Потоки', 'Блюпринты', 'Сессии']
+
+    def test_with_search(self, client):
+        """Тест фильтра по тегам вместе с поиском"""
+        self._add(client)
+
+        response = client.get('/questions?search=orm&tag=flask&tag=orm'
+                              '&mode=any')
+        assert self._titles(response) == ['Сессии']
+        body = response.get_data(as_text=True)
+        assert '<input type="hidden" name="tag" value="flask">' in body
+        assert '<input type="hidden" name="mode" value="any">' in body
+
+    def test_tag_links_toggle(self, client):
+        """Тест ссылок тегов: добавление к выбранным и снятие выбора"""
+        self._add(client)
+
+        body = client.get('/questions?tag=python').get_data(as_text=True)
+        links = re.findall(r'href="/questions\?([^"]*)"', body)
+        assert 'tag=python&amp;tag=flask&amp;search=&amp;mode=all' in links
+        # «Все» и повторный клик по выбранному тегу снимают фильтр
+        assert links.count('search=') == 2
+
+    def test_tag_index_used(self, client):
+        """Тест, что выборка по тегу идёт по индексу (tag_id, question_id)"""
+        from sqlalchemy import select
+        from cp_app.tags import tag_filter
+        self._add(client)
+
+        with client.application.app_context():
+            statement = select(Question.id).where(
+                tag_filter(['python', 'orm'], 'any'))
+            compiled = statement.compile(
+                db.engine, compile_kwargs={'literal_binds': True})
+            plan = db.session.execute(
+                db.text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+        assert 'ix_question_tags_tag_id_question_id' in ' '.join(
+            row[-1] for row in plan)
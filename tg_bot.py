@@ -32,6 +32,60 @@ async def start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     )
 
 
+# -------------------- Загрузка id вопросов --------------------
+# Последний полный список id и ETag коллекции, с которым он получен
+_ids_cache = {"etag": None, "ids": []}
+
+
+def fetch_all_question_ids():
+    """Обходит /api/questions/ постранично по курсору next.
+
+    Все страницы несут общий ETag версии коллекции, поэтому если первая
+    ответила 304, закешированный список id ещё актуален.
+    """
+    ids = []
+    params = {"limit": 500, "fields": "id"}
+    headers = {}
+    if _ids_cache["etag"]:
+        headers["If-None-Match"] = _ids_cache["etag"]
+    while True:
+        print(
+            f"Requesting questions from {FLASK_HOST}/api/questions/ {params}",
+            flush=True
+        )
+        r = requests.get(
+            f"{FLASK_HOST}/api/questions/", params=params, headers=headers,
+            timeout=10
+        )
+        print(f"Response status: {r.status_code}", flush=True)
+        if r.status_code == 304:
+            return list(_ids_cache["ids"])
+        r.raise_for_status()
+        headers = {}
+        page = r.json()
+        ids.extend(q["id"] for q in page["questions"])
+        if page.get("next") is None:
+            _ids_cache["etag"] = r.headers.get("ETag")
+            _ids_cache["ids"] = ids
+            return list(ids)
+        params["after_id"] = page["next"]
+
+
+def fetch_questions(ids):
+    """Загружает вопросы квиза одним пакетным запросом.
+
+    Возвращает вопросы в порядке ids; удалённые к этому моменту пропускаются.
+    """
+    r = requests.post(
+        f"{FLASK_HOST}/api/questions/batch", json={"ids": ids}, timeout=10
+    )
+    r.raise_for_status()
+    data = r.json()
+    if data["missing"]:
+        print(f"Questions not found: {data['missing']}", flush=True)
+    return data["questions"]
+
+
 # -------------------- Запуск квиза --------------------
 async def quiz_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     """Инициализация квиза и отправка первого вопроса"""
@@ -44,15 +98,13 @@ async def quiz_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     else:
         print("No callback query, this is a message", flush=True)
 
-    # Получаем все id вопросов
+    # Получаем все id вопросов, выбираем 10 уникальных или меньше
+    # и сразу загружаем их одним запросом
     try:
-        print(f"Requesting questions from {FLASK_HOST}/api/questions/", flush=True)
-        r = requests.get(f"{FLASK_HOST}/api/questions/", timeout=10)
-        print(f"Response status: {r.status_code}", flush=True)
-        r.raise_for_status()
-        all_questions = r.json()["questions"]
-        print(f"Got {len(all_questions)} questions", flush=True)
-        all_ids = [q["id"] for q in all_questions]
+        all_ids = fetch_all_question_ids()
+        print(f"Got {len(all_ids)} questions", flush=True)
+        k = min(10, len(all_ids))
+        questions = fetch_questions(random.sample(all_ids, k=k)) if k else []
     except Exception as e:
         print(
             "Ошибка при получении списка вопросов для квиза:",
@@ -67,22 +119,19 @@ async def quiz_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Не удалось начать квиз 😥")
         return
 
-    if not all_ids:
+    if not questions:
         if query:
             await query.message.reply_text("В базе нет вопросов 😥")
         else:
             await update.message.reply_text("В базе нет вопросов 😥")
         return
 
-    # Формируем 10 уникальных или меньше
-    k = min(10, len(all_ids))
-    quiz_ids = random.sample(all_ids, k=k)
-
-    # Сохраняем прогресс в user_data
-    ctx.user_data['quiz_ids'] = quiz_ids
+    # Сохраняем прогресс и сами вопросы в user_data
+    ctx.user_data['quiz_ids'] = [q["id"] for q in questions]
+    ctx.user_data['quiz_questions'] = {q["id"]: q for q in questions}
     ctx.user_data['quiz_index'] = 0
     ctx.user_data['quiz_correct'] = 0
-    ctx.user_data['quiz_total'] = k
+    ctx.user_data['quiz_total'] = len(questions)
 
     # Отправляем первый вопрос
     await send_quiz_question(update, ctx)
@@ -92,20 +141,7 @@ async def quiz_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
 async def send_quiz_question(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     idx = ctx.user_data['quiz_index']
     q_id = ctx.user_data['quiz_ids'][idx]
-
-    try:
-        r = requests.get(f"{FLASK_HOST}/api/questions/{q_id}/", timeout=10)
-        r.raise_for_status()
-        question = r.json()["question"]
-    except Exception as e:
-        print("Ошибка при получении вопроса для квиза:", repr(e), flush=True)
-        if update.callback_query:
-            await update.callback_query.message.reply_text(
-                "Ошибка при загрузке вопроса 😥"
-            )
-        else:
-            await update.message.reply_text("Ошибка при загрузке вопроса 😥")
-        return
+    question = ctx.user_data['quiz_questions'][q_id]
 
     # Кнопки "Знаю / Не знаю"
     keyboard = [
@@ -145,15 +181,8 @@ async def quiz_answer_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     idx = ctx.user_data['quiz_index']
     q_id = ctx.user_data['quiz_ids'][idx]
 
-    # Получаем полный ответ на вопрос
-    try:
-        r = requests.get(f"{FLASK_HOST}/api/questions/{q_id}/", timeout=10)
-        r.raise_for_status()
-        question = r.json()["question"]
-    except Exception as e:
-        print("Ошибка при получении ответа для квиза:", repr(e), flush=True)
-        await query.message.reply_text("Ошибка при загрузке ответа 😥")
-        return
+    # Полный ответ уже загружен вместе с квизом
+    question = ctx.user_data['quiz_questions'][q_id]
 
     # Подготовка текста
     text_md = md(question["text"]).strip()